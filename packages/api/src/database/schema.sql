@@ -77,7 +77,8 @@ CREATE TABLE subscription_history (
 CREATE TABLE rents (
     id SERIAL PRIMARY KEY,
     zip_code VARCHAR(10) NOT NULL,
-    town VARCHAR(100),
+    town VARCHAR(100), -- Canonical municipality (see scripts/town_normalization.py)
+    neighborhood VARCHAR(100), -- e.g. 'Back Bay' for town 'Boston'
     county VARCHAR(100),
     market_tier VARCHAR(50) DEFAULT 'unknown',
     studio_rent DECIMAL(10,2),
@@ -87,6 +88,7 @@ CREATE TABLE rents (
     four_br_rent DECIMAL(10,2),
     five_br_rent DECIMAL(10,2),
     six_br_rent DECIMAL(10,2),
+    effective_year INTEGER, -- Payment Standards year the rents apply to
     source VARCHAR(50) DEFAULT 'bha',
     metadata JSONB, -- Additional data like update frequency, source details
     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
@@ -94,6 +96,100 @@ CREATE TABLE rents (
     UNIQUE(zip_code, source)
 );
 
+-- Canonical rents reconciled from every rent source (one row per zip/bedroom cell)
+CREATE TABLE rents_canonical (
+    zip_code VARCHAR(10) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    rent DECIMAL(10,2) NOT NULL,
+    town VARCHAR(100),
+    county VARCHAR(100),
+    market_tier VARCHAR(50) DEFAULT 'unknown',
+    effective_year INTEGER,
+    source VARCHAR(100) NOT NULL, -- Winning source for this cell
+    source_priority INTEGER NOT NULL, -- Precedence rank of the winning source (lower wins)
+    source_updated_at TIMESTAMP,
+    candidate_count INTEGER NOT NULL DEFAULT 1, -- Number of sources that had a value for this cell
+    is_stale BOOLEAN NOT NULL DEFAULT false,
+    reconciled_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (zip_code, bedrooms)
+);
+
+-- Rent statistics per county / market tier, bedroom count and year
+-- (maintained incrementally from changed rents_canonical cells)
+CREATE TABLE rent_aggregates (
+    group_type VARCHAR(20) NOT NULL, -- 'county' or 'market_tier'
+    group_value VARCHAR(100) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    effective_year INTEGER NOT NULL,
+    zip_count INTEGER NOT NULL,
+    mean_rent DECIMAL(10,2),
+    median_rent DECIMAL(10,2),
+    p10_rent DECIMAL(10,2),
+    p90_rent DECIMAL(10,2),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (group_type, group_value, bedrooms, effective_year)
+);
+
+-- Every Payment Standards year ever loaded (the rents table only keeps the latest)
+CREATE TABLE payment_standards_history (
+    zip_code VARCHAR(10) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    effective_year INTEGER NOT NULL,
+    rent DECIMAL(10,2) NOT NULL,
+    source VARCHAR(100),
+    recorded_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (zip_code, bedrooms, effective_year)
+);
+
+-- Year-over-year and compound growth per zip/bedroom cell (rebuilt by scripts/rent_trends.py)
+CREATE TABLE rent_trends (
+    zip_code VARCHAR(10) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    effective_year INTEGER NOT NULL,
+    rent DECIMAL(10,2) NOT NULL,
+    previous_year INTEGER, -- Latest earlier year on record (YoY is annualized across gaps)
+    previous_rent DECIMAL(10,2),
+    yoy DECIMAL(9,5),
+    base_year INTEGER NOT NULL, -- First year on record (CAGR runs from here)
+    cagr DECIMAL(9,5),
+    county VARCHAR(100),
+    market_tier VARCHAR(50),
+    yoy_zscore DECIMAL(10,3), -- Modified z-score within county, bedrooms and year
+    is_outlier BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (zip_code, bedrooms, effective_year)
+);
+
+-- County / market tier roll-ups of rent_trends
+CREATE TABLE rent_trend_aggregates (
+    group_type VARCHAR(20) NOT NULL, -- 'county' or 'market_tier'
+    group_value VARCHAR(100) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    effective_year INTEGER NOT NULL,
+    zip_count INTEGER NOT NULL,
+    mean_yoy DECIMAL(9,5),
+    median_yoy DECIMAL(9,5),
+    median_cagr DECIMAL(9,5),
+    outlier_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (group_type, group_value, bedrooms, effective_year)
+);
+
+-- Append-only log of changed rents_canonical cells, one load_id per reconciliation
+-- (each load is also announced on the 'rent_changes' NOTIFY channel; consumers resume from id)
+CREATE TABLE rent_change_log (
+    id BIGSERIAL PRIMARY KEY,
+    load_id UUID NOT NULL,
+    zip_code VARCHAR(10) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    change_type VARCHAR(10) NOT NULL, -- 'insert', 'update', 'delete'
+    source VARCHAR(100), -- Winning source after the change (NULL for deletes)
+    previous_source VARCHAR(100),
+    rent DECIMAL(10,2),
+    previous_rent DECIMAL(10,2),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- Property listings table
 CREATE TABLE listings (
     id SERIAL PRIMARY KEY,
@@ -112,6 +208,7 @@ CREATE TABLE listings (
     status VARCHAR(50) DEFAULT 'active',
     source VARCHAR(50) DEFAULT 'mls',
     raw_data JSONB, -- Store the original JSON data
+    content_hash VARCHAR(64), -- SHA-256 of the normalized listing fields (see scripts/listing_ingestion.py)
     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
@@ -151,6 +248,30 @@ CREATE TABLE property_overrides (
     UNIQUE(list_no, user_id)
 );
 
+-- Rent cells each listing / comp is priced off (scripts/listing_dependencies.py), so a rent
+-- load re-underwrites only the rows that read a changed zip/bedroom cell
+CREATE TABLE listing_rent_dependencies (
+    source VARCHAR(20) NOT NULL, -- 'listings' or 'comps'
+    list_no VARCHAR(50) NOT NULL,
+    zip_code VARCHAR(10) NOT NULL,
+    bedrooms SMALLINT NOT NULL,
+    PRIMARY KEY (source, list_no, zip_code, bedrooms)
+);
+
+-- Memoized per-listing analysis (scripts/analysis_cache.py); superseded versions age out by last use
+CREATE TABLE listing_analysis_cache (
+    cache_key VARCHAR(64) PRIMARY KEY, -- SHA-256 of the version fields below
+    list_no VARCHAR(50) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL, -- listings.content_hash the result was computed from
+    rent_version VARCHAR(100) NOT NULL, -- Rent snapshot of the listing's ZIP (effective year, reconciled_at, cells)
+    override_hash VARCHAR(64) NOT NULL DEFAULT '', -- Digest of the applied property_overrides unit_mix/opex
+    rent_mode VARCHAR(10) NOT NULL,
+    result JSONB NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- Data source tracking table
 CREATE TABLE data_sources (
     id SERIAL PRIMARY KEY,
@@ -159,7 +280,7 @@ CREATE TABLE data_sources (
     url VARCHAR(500),
     api_key_hash VARCHAR(255), -- Hashed API key for security
     last_sync_at TIMESTAMP,
-    sync_frequency VARCHAR(50), -- 'hourly', 'daily', 'weekly', 'manual'
+    sync_frequency VARCHAR(50), -- 'hourly', 'daily', 'weekly', 'monthly', 'manual'
     is_active BOOLEAN NOT NULL DEFAULT true,
     metadata JSONB,
     created_at TIMESTAMP NOT NULL DEFAULT NOW(),
@@ -171,7 +292,7 @@ CREATE TABLE data_sync_logs (
     id SERIAL PRIMARY KEY,
     source_id INTEGER REFERENCES data_sources(id) ON DELETE CASCADE,
     sync_type VARCHAR(50) NOT NULL, -- 'full', 'incremental', 'manual'
-    status VARCHAR(50) NOT NULL, -- 'success', 'failed', 'partial'
+    status VARCHAR(50) NOT NULL, -- 'running', 'success', 'failed', 'partial'
     records_processed INTEGER DEFAULT 0,
     records_updated INTEGER DEFAULT 0,
     records_added INTEGER DEFAULT 0,
@@ -182,6 +303,24 @@ CREATE TABLE data_sync_logs (
     metadata JSONB
 );
 
+-- Pipeline job queue (claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED)
+CREATE TABLE pipeline_jobs (
+    id SERIAL PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES data_sources(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(255), -- Worker id (host:pid:nonce) holding the job
+    locked_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    sync_log_id INTEGER REFERENCES data_sync_logs(id) ON DELETE SET NULL,
+    error_message TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMP
+);
+
 -- ============================================================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================================================
@@ -199,6 +338,15 @@ CREATE INDEX idx_saved_searches_created_at ON saved_searches(created_at);
 CREATE INDEX idx_rents_zip_code ON rents(zip_code);
 CREATE INDEX idx_rents_town ON rents(town);
 CREATE INDEX idx_rents_source ON rents(source);
+CREATE INDEX idx_rents_canonical_town ON rents_canonical(town);
+CREATE INDEX idx_rents_canonical_market_tier ON rents_canonical(market_tier, effective_year);
+CREATE INDEX idx_rents_canonical_county ON rents_canonical(county, effective_year);
+CREATE INDEX idx_rent_trends_outliers ON rent_trends(effective_year) WHERE is_outlier;
+CREATE INDEX idx_listing_rent_dependencies_cell ON listing_rent_dependencies(zip_code, bedrooms);
+CREATE INDEX idx_listing_analysis_cache_last_used ON listing_analysis_cache(last_used_at);
+CREATE INDEX idx_listing_analysis_cache_list_no ON listing_analysis_cache(list_no);
+CREATE INDEX idx_rent_change_log_load_id ON rent_change_log(load_id);
+CREATE INDEX idx_rent_change_log_zip_code ON rent_change_log(zip_code, id);
 CREATE INDEX idx_listings_list_no ON listings(list_no);
 CREATE INDEX idx_listings_zip_code ON listings(zip_code);
 CREATE INDEX idx_listings_town ON listings(town);
@@ -212,6 +360,10 @@ CREATE INDEX idx_data_sources_type ON data_sources(type);
 CREATE INDEX idx_data_sync_logs_source_id ON data_sync_logs(source_id);
 CREATE INDEX idx_data_sync_logs_status ON data_sync_logs(status);
 CREATE INDEX idx_data_sync_logs_started_at ON data_sync_logs(started_at);
+-- At most one pending or running job per source, so refreshes of a source never overlap
+CREATE UNIQUE INDEX idx_pipeline_jobs_active_source ON pipeline_jobs(source_id) WHERE status IN ('queued', 'running');
+CREATE INDEX idx_pipeline_jobs_claim ON pipeline_jobs(run_after, id) WHERE status = 'queued';
+CREATE INDEX idx_pipeline_jobs_heartbeat ON pipeline_jobs(heartbeat_at) WHERE status = 'running';
 
 -- ============================================================================
 -- TRIGGERS FOR UPDATED_AT TIMESTAMPS
@@ -251,6 +403,9 @@ CREATE TRIGGER update_property_overrides_updated_at BEFORE UPDATE ON property_ov
 CREATE TRIGGER update_data_sources_updated_at BEFORE UPDATE ON data_sources
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_pipeline_jobs_updated_at BEFORE UPDATE ON pipeline_jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
 -- ============================================================================
 -- INITIAL DATA SOURCES
 -- ============================================================================
@@ -259,6 +414,9 @@ INSERT INTO data_sources (name, type, sync_frequency, metadata) VALUES
 ('bha-rents', 'bha', 'weekly', '{"description": "BHA Comprehensive Rent Data", "source_file": "bha-rents-comprehensive.json"}'),
 ('mls-listings', 'mls', 'daily', '{"description": "MLS Property Listings", "source_file": "listings.json"}'),
 ('comps-data', 'external', 'weekly', '{"description": "Comparable Properties", "source_file": "comps.json"}'),
-('manual-overrides', 'manual', 'manual', '{"description": "User-defined Property Overrides", "source_file": "overrides.json"}')
+('manual-overrides', 'manual', 'manual', '{"description": "User-defined Property Overrides", "source_file": "overrides.json"}'),
+('bha-payment-standards', 'bha', 'monthly', '{"description": "BHA Payment Standards PDFs", "script": "bha-payment-standards-future.py"}'),
+('bha-income-restricted', 'bha', 'weekly', '{"description": "Boston income-restricted housing (CKAN)", "script": "bha-data-integration.py"}'),
+('bha-rent-estimator', 'bha', 'weekly', '{"description": "BHA Rent Estimator", "script": "bha-rent-data-integration.py"}')
 ON CONFLICT (name) DO NOTHING;
 
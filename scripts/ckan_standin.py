@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+CKAN Stand-in Script
+Local CKAN action API (package_show, datastore_search, datastore_search_sql) over SQLite, for exercising DataStore reads offline
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sqlite3
+import threading
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from ckan_datastore import quote_identifier
+
+logger = logging.getLogger(__name__)
+
+DATASET_ID = 'income-restricted-housing'
+RESOURCE_ID = 'standin-resource'
+
+# DataStore schema of the sample resource (`_id` is added by the DataStore itself)
+SAMPLE_FIELDS = [
+    {'id': 'zip_code', 'type': 'text'},
+    {'id': 'town', 'type': 'text'},
+    {'id': 'units', 'type': 'int4'},
+    {'id': 'two_br_rent', 'type': 'numeric'},
+    {'id': 'last_modified', 'type': 'timestamp'}
+]
+
+DEFAULT_LIMIT = 100
+
+
+def sample_records(count: int) -> List[Dict]:
+    """Rows for the sample resource: leading-zero ZIPs, mixed town spellings, one modification date each"""
+    return [{
+        'zip_code': f"0{2100 + i % 90}",
+        'town': 'Boston - Back Bay' if i % 2 else 'Milton, MA',
+        'units': i % 7,
+        'two_br_rent': 1500 + i,
+        'last_modified': f"2025-01-{1 + i % 28:02d}T00:00:00"
+    } for i in range(count)]
+
+
+class CKANStandIn:
+    """CKAN Stand-in Class
+    
+    Serves one dataset with one DataStore resource from an in-memory SQLite table,
+    implementing the parameters CKANDataStoreReader sends: `fields`, `sort=_id`,
+    `offset/limit`, `records_format=csv` and read-only `datastore_search_sql`.
+    Counts requests per action so tests can check how a read was paged.
+    """
+    
+    def __init__(self, records: List[Dict], fields: Optional[List[Dict]] = None,
+                 dataset_id: str = DATASET_ID, resource_id: str = RESOURCE_ID, port: int = 0):
+        self.fields = fields or SAMPLE_FIELDS
+        self.dataset_id = dataset_id
+        self.resource_id = resource_id
+        self.port = port
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+        self.table = quote_identifier(resource_id)
+        columns = ', '.join(quote_identifier(f['id']) for f in self.fields)
+        self.db.execute(f'CREATE TABLE {self.table} ("_id" INTEGER PRIMARY KEY, {columns})')
+        self.upsert(records)
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api/3"
+    
+    def upsert(self, records: List[Dict]):
+        """Insert rows, or update them in place when they carry an existing `_id`"""
+        names = ['_id'] + [f['id'] for f in self.fields]
+        placeholders = ', '.join('?' for _ in names)
+        with self.lock:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(map(quote_identifier, names))}) "
+                f"VALUES ({placeholders})",
+                [[record.get(name) for name in names] for record in records]
+            )
+    
+    def package_show(self, params: Dict) -> Dict:
+        if params.get('id') != self.dataset_id:
+            raise KeyError(f"Dataset not found: {params.get('id')}")
+        return {'id': self.dataset_id, 'resources': [{
+            'id': self.resource_id,
+            'format': 'CSV',
+            'created': '2025-01-01T00:00:00',
+            'url': f"{self.base_url}/datastore/dump/{self.resource_id}",
+            'datastore_active': True
+        }]}
+    
+    def datastore_search(self, params: Dict) -> Dict:
+        if params.get('resource_id') != self.resource_id:
+            raise KeyError(f"Resource not found: {params.get('resource_id')}")
+            
+        schema = [{'id': '_id', 'type': 'int'}] + self.fields
+        fields = params['fields'].split(',') if params.get('fields') else [f['id'] for f in schema]
+        unknown = set(fields) - {f['id'] for f in schema}
+        if unknown:
+            raise KeyError(f"Unknown fields: {sorted(unknown)}")
+        if params.get('sort', '_id') != '_id':
+            raise ValueError("The stand-in only sorts by _id")
+            
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        offset = int(params.get('offset', 0))
+        with self.lock:
+            total = self.db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            rows = self.db.execute(
+                f"SELECT {', '.join(map(quote_identifier, fields))} FROM {self.table} "
+                f"ORDER BY \"_id\" LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        
+        if params.get('records_format') == 'csv':
+            # Like CKAN: CSV rows without a header, in the order of `fields`
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator='\n').writerows(rows)
+            records = buffer.getvalue()
+        else:
+            records = [dict(zip(fields, row)) for row in rows]
+        
+        result = {'fields': [f for f in schema if f['id'] in fields], 'records': records}
+        if params.get('include_total', 'true') != 'false':
+            result['total'] = total
+        return result
+    
+    def datastore_search_sql(self, params: Dict) -> Dict:
+        sql = params['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            raise ValueError("Only SELECT statements are allowed")
+        with self.lock:
+            cursor = self.db.execute(sql)
+            columns = [d[0] for d in cursor.description]
+            return {'records': [dict(zip(columns, row)) for row in cursor.fetchall()]}
+    
+    def handle(self, action: str, params: Dict) -> Dict:
+        """CKAN response envelope for one action call"""
+        with self.lock:
+            self.requests[action] += 1
+        handler = {'package_show': self.package_show, 'datastore_search': self.datastore_search,
+                   'datastore_search_sql': self.datastore_search_sql}.get(action)
+        if handler is None:
+            return {'success': False, 'error': {'message': f"Unknown action: {action}"}}
+        try:
+            return {'success': True, 'result': handler(params)}
+        except Exception as e:
+            return {'success': False, 'error': {'message': str(e)}}
+    
+    def start(self) -> str:
+        """Serve on a background thread; returns the API base URL (use as CKAN_API_URL)"""
+        standin = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+            
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                params = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+                body = json.dumps(standin.handle(url.path.rsplit('/', 1)[-1], params)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='ckan-standin', daemon=True).start()
+        logger.info(f"CKAN stand-in serving {self.resource_id} at {self.base_url}")
+        return self.base_url
+    
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
+    parser = argparse.ArgumentParser(description='Local CKAN DataStore stand-in')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    
+    standin = CKANStandIn(sample_records(args.rows), port=args.port)
+    try:
+        print(f"✅ CKAN stand-in at {standin.start()} ({args.rows} rows); Ctrl-C to stop")
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
+        exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Comps Search Script
+K-nearest comparable sales over the MLS export, with distance-weighted price-per-unit estimates
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from nearest_zip_rents import EARTH_RADIUS_KM, load_centroids, to_unit_vectors
+
+logger = logging.getLogger(__name__)
+
+MLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'seed', 'data', 'mls.csv')
+
+MLS_COLUMNS = ['LIST_NO', 'ADDRESS', 'TOWN', 'ZIP_CODE', 'STATUS', 'LIST_PRICE', 'SALE_PRICE', 'LIST_DATE',
+               'SETTLED_DATE', 'NO_UNITS_MF', 'TOTAL_BRS_MF',
+               'BEDRMS_1_MF', 'BEDRMS_2_MF', 'BEDRMS_3_MF', 'BEDRMS_4_MF', 'BEDRMS_5_MF']
+
+# MLS PIN statuses of listings still on the market (new, active, price change, back on market, extended)
+ACTIVE_STATUSES = {'NEW', 'ACT', 'PCG', 'BOM', 'EXT'}
+
+DEFAULT_K = 10
+
+# Relative weight of each standardized feature in the distance. Price per unit is what the
+# comps estimate, so it is not a feature: matching on the subject's own price would pull the
+# estimate toward it and shrink every premium toward zero.
+FEATURE_WEIGHTS = {
+    'units': 1.0,
+    'bedrooms': 1.0,
+    'recency': 0.5,
+    'location': 1.0
+}
+
+# Two properties this far apart differ by as much as one standard deviation of a scalar feature
+LOCATION_SCALE_KM = 10.0
+
+IDW_POWER = 1.0
+
+# Comps closer than this are weighted as if they were this far away (keeps exact twins finite)
+MIN_DISTANCE = 0.05
+
+SCALAR_FEATURES = ['units', 'bedrooms', 'recency']
+
+
+def load_mls(path: str = MLS_PATH, as_of: Optional[datetime] = None) -> pd.DataFrame:
+    """One row per MLS record with the comp fields.
+    
+    Sold records are priced at SALE_PRICE and dated by SETTLED_DATE; listings at
+    LIST_PRICE and LIST_DATE.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, usecols=[c for c in MLS_COLUMNS if c in header], dtype={'LIST_NO': str, 'ZIP_CODE': str},
+                     low_memory=False)
+    for column in MLS_COLUMNS:
+        if column not in df.columns:
+            df[column] = np.nan
+    
+    df['LIST_NO'] = df['LIST_NO'].str.strip()
+    df['ZIP_CODE'] = df['ZIP_CODE'].fillna('').str.strip().str.split('-').str[0].str.zfill(5)
+    df['STATUS'] = df['STATUS'].fillna('').astype(str).str.strip().str.upper()
+    
+    sale_price = pd.to_numeric(df['SALE_PRICE'], errors='coerce')
+    df['sold'] = sale_price > 0
+    df['price'] = sale_price.where(df['sold'], pd.to_numeric(df['LIST_PRICE'], errors='coerce'))
+    dated = pd.to_datetime(df['SETTLED_DATE'].where(df['sold'], df['LIST_DATE']), errors='coerce', format='mixed')
+    df['days_since'] = (pd.Timestamp(as_of or datetime.now()).normalize() - dated).dt.days
+    
+    # Total bedrooms from the MLS total, else the per-unit bedroom fields (as the listings loader does)
+    per_unit = df[[f'BEDRMS_{n}_MF' for n in range(1, 6)]].apply(pd.to_numeric, errors='coerce')
+    df['units'] = pd.to_numeric(df['NO_UNITS_MF'], errors='coerce')
+    df['bedrooms'] = pd.to_numeric(df['TOTAL_BRS_MF'], errors='coerce').where(lambda b: b > 0,
+                                                                               per_unit.sum(axis=1, min_count=1))
+    df['price_per_unit'] = df['price'] / df['units'].where(df['units'] > 0)
+    return df.drop_duplicates('LIST_NO', keep='last').reset_index(drop=True)
+
+
+class CompsSearchIndex:
+    """Comps Search Index Class
+    
+    Each comp becomes a weighted feature vector: standardized log units and log bedrooms,
+    standardized recency, and its ZIP centroid as a unit vector scaled
+    so LOCATION_SCALE_KM counts as one standard deviation. One KD-tree over the pool answers
+    every listing's k nearest comps in a single batched query.
+    """
+    
+    def __init__(self, comps: pd.DataFrame, centroids: pd.DataFrame, weights: Optional[Dict[str, float]] = None,
+                 location_scale_km: float = LOCATION_SCALE_KM, power: float = IDW_POWER):
+        self.weights = {**FEATURE_WEIGHTS, **(weights or {})}
+        self.location_scale_km = location_scale_km
+        self.power = power
+        self.centroids = centroids.set_index('zip_code')[['latitude', 'longitude']]
+        
+        comps = comps[(comps['price_per_unit'] > 0) & (comps['units'] > 0)]
+        raw = self.raw_features(comps)
+        self.mean = np.nanmean(raw[SCALAR_FEATURES].to_numpy(), axis=0)
+        self.std = np.nanstd(raw[SCALAR_FEATURES].to_numpy(), axis=0)
+        self.std[~(self.std > 0)] = 1.0
+        
+        features = self.features(comps)
+        usable = np.isfinite(features).all(axis=1)
+        if not usable.all():
+            logger.warning(f"{int((~usable).sum())} comps have no ZIP centroid and cannot be matched")
+        self.comps = comps[usable].reset_index(drop=True)
+        self.tree = cKDTree(features[usable])
+    
+    @classmethod
+    def from_mls(cls, path: str = MLS_PATH, sold_only: bool = False, centroids_path: Optional[str] = None,
+                 as_of: Optional[datetime] = None, **kwargs) -> 'CompsSearchIndex':
+        """Index the MLS export (closed sales only with sold_only)"""
+        records = load_mls(path, as_of)
+        return cls(records[records['sold']] if sold_only else records, load_centroids(centroids_path), **kwargs)
+    
+    def raw_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Unscaled scalar features; missing bedrooms default to two per unit, missing dates to the median age"""
+        bedrooms = df['bedrooms'].where(df['bedrooms'] > 0, df['units'] * 2)
+        return pd.DataFrame({
+            'units': np.log1p(df['units'].clip(lower=0)),
+            'bedrooms': np.log1p(bedrooms.clip(lower=0)),
+            'recency': df['days_since'].fillna(df['days_since'].median()).clip(lower=0)
+        }, index=df.index)
+    
+    def features(self, df: pd.DataFrame) -> np.ndarray:
+        """Weighted, standardized feature matrix (NaN rows where a field or the ZIP centroid is missing)"""
+        scalar = (self.raw_features(df)[SCALAR_FEATURES].to_numpy() - self.mean) / self.std
+        scalar *= np.array([self.weights[f] for f in SCALAR_FEATURES])
+        
+        points = self.centroids.reindex(df['ZIP_CODE'].to_numpy())
+        location = to_unit_vectors(points['latitude'], points['longitude'])
+        location *= EARTH_RADIUS_KM / self.location_scale_km * self.weights['location']
+        return np.hstack([scalar, location])
+    
+    def search(self, listings: pd.DataFrame, k: int = DEFAULT_K) -> pd.DataFrame:
+        """The k nearest comps for each listing (itself excluded) and their weighted price per unit.
+        
+        Returns one row per listing with the comp LIST_NOs and distances (nearest first), the
+        estimate, and the listing's price per unit against it.
+        """
+        result = listings[['LIST_NO', 'ZIP_CODE', 'units', 'price_per_unit']].reset_index(drop=True)
+        features = self.features(listings)
+        located = np.isfinite(features).all(axis=1)
+        
+        comp_list_nos = np.full(len(result), None, dtype=object)
+        comp_distances = np.full(len(result), None, dtype=object)
+        estimates = np.full(len(result), np.nan)
+        counts = np.zeros(len(result), dtype=int)
+        
+        n = min(k + 1, len(self.comps))
+        if located.any() and n > 0:
+            distances, positions = self.tree.query(features[located], k=n, workers=-1)
+            distances, positions = distances.reshape(-1, n), positions.reshape(-1, n)
+            
+            # Drop each listing's own record, then keep the k nearest that remain
+            pool_list_nos = self.comps['LIST_NO'].to_numpy()
+            keep = pool_list_nos[positions] != result['LIST_NO'].to_numpy()[located][:, None]
+            order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            positions = np.take_along_axis(positions, order, axis=1)
+            keep = np.take_along_axis(keep, order, axis=1)
+            
+            weights = np.where(keep, 1 / np.maximum(distances, MIN_DISTANCE) ** self.power, 0)
+            weight_sums = weights.sum(axis=1)
+            prices = self.comps['price_per_unit'].to_numpy()[positions]
+            estimates[located] = np.where(
+                weight_sums > 0, (weights * prices).sum(axis=1) / np.where(weight_sums > 0, weight_sums, 1), np.nan
+            )
+            counts[located] = keep.sum(axis=1)
+            for row, ids, row_distances, mask in zip(np.flatnonzero(located), pool_list_nos[positions],
+                                                     distances, keep):
+                comp_list_nos[row] = ids[mask].tolist()
+                comp_distances[row] = np.round(row_distances[mask], 3).tolist()
+        
+        result['comp_count'] = counts
+        result['est_price_per_unit'] = np.round(estimates, 0)
+        result['premium_pct'] = np.round((result['price_per_unit'] / result['est_price_per_unit'] - 1) * 100, 1)
+        result['comp_list_nos'] = comp_list_nos
+        result['comp_distances'] = comp_distances
+        return result
+
+
+def active_listings(records: pd.DataFrame) -> pd.DataFrame:
+    """Records still on the market (active MLS status, not sold): the listings to find comps for"""
+    return records[records['STATUS'].isin(ACTIVE_STATUSES) & ~records['sold']]
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/comps-search.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    parser = argparse.ArgumentParser(description='K-nearest comparable sales search')
+    parser.add_argument('--mls', default=MLS_PATH)
+    parser.add_argument('-k', type=int, default=DEFAULT_K)
+    parser.add_argument('--sold-only', action='store_true', help='Use closed sales only as comps')
+    parser.add_argument('--output', default=None, help='Write the comps per listing as JSON')
+    args = parser.parse_args()
+    
+    try:
+        records = load_mls(args.mls)
+        index = CompsSearchIndex(records[records['sold']] if args.sold_only else records, load_centroids())
+        listings = active_listings(records)
+        
+        started = time.perf_counter()
+        comps = index.search(listings, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Found up to {args.k} comps for {len(comps)} active listings from a pool of "
+                    f"{len(index.comps)} in {elapsed_ms:.1f} ms")
+        
+        if args.output:
+            comps.to_json(args.output, orient='records', indent=2)
+            logger.info(f"Comps saved to: {args.output}")
+        
+        matched = int((comps['comp_count'] > 0).sum())
+        print(f"✅ Comps found for {matched} of {len(comps)} active listings")
+        exit(0)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Data Retention Script
+Compresses, deduplicates and prunes pipeline artifacts in the rent-api data directory
+"""
+
+import json
+import gzip
+import hashlib
+import io
+import logging
+from datetime import datetime
+import os
+import re
+import shutil
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'retention_index.json'
+ARCHIVE_DIRNAME = 'archive'
+
+# Small state files other scripts read and rewrite in place
+EXCLUDED_FILES = {INDEX_FILENAME, 'current_year.txt', 'ckan-watermarks.json'}
+
+# In-progress writes and precompressed variants (regenerated with every JSON export)
+SKIPPED_SUFFIXES = ('.tmp', '.gz', '.br')
+
+# Timestamped outputs (e.g. bha_rent_data_20250812_020000.csv) form one family per name pattern
+TIMESTAMP_PATTERN = re.compile(r'\d{8}_\d{6}')
+YEAR_PATTERN = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+COMPRESSION_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+
+
+class DataRetentionManager:
+    """Data Retention Manager Class"""
+    
+    def __init__(self, data_dir: str = "/opt/rent-api/data", keep_last: Optional[int] = None,
+                 keep_per_year: Optional[int] = None, compression: Optional[str] = None,
+                 min_age_seconds: int = 60):
+        self.data_dir = data_dir
+        self.archive_dir = os.path.join(data_dir, ARCHIVE_DIRNAME)
+        self.index_path = os.path.join(data_dir, INDEX_FILENAME)
+        self.keep_last = keep_last if keep_last is not None else int(os.getenv('RETENTION_KEEP_LAST', '5'))
+        self.keep_per_year = keep_per_year if keep_per_year is not None else int(os.getenv('RETENTION_KEEP_PER_YEAR', '1'))
+        self.compression = self.resolve_compression(compression or os.getenv('RETENTION_COMPRESSION', 'zstd'))
+        
+        # Files modified more recently than this may still be being written
+        self.min_age_seconds = min_age_seconds
+        
+        # Create archive directory if it doesn't exist
+        os.makedirs(self.archive_dir, exist_ok=True)
+    
+    def resolve_compression(self, compression: str) -> str:
+        """Use zstd when the zstandard package is installed, gzip otherwise"""
+        if compression == 'zstd':
+            try:
+                import zstandard  # noqa: F401
+                return 'zstd'
+            except ImportError:
+                logger.info("zstandard not installed, falling back to gzip")
+                return 'gzip'
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        return compression
+    
+    def family_of(self, name: str) -> str:
+        """Group timestamped outputs of the same kind under one family name"""
+        return TIMESTAMP_PATTERN.sub('{timestamp}', name)
+    
+    def year_of(self, name: str, created_at: str) -> int:
+        """Year an artifact belongs to: from its timestamp or year in the name, else its mtime"""
+        match = TIMESTAMP_PATTERN.search(name) or YEAR_PATTERN.search(name)
+        return int(match.group(0)[:4]) if match else int(created_at[:4])
+    
+    def load_index(self) -> Dict:
+        """Load the snapshot index"""
+        if not os.path.exists(self.index_path):
+            return {'blobs': {}, 'snapshots': []}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+    
+    def save_index(self, index: Dict):
+        """Write the snapshot index atomically"""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+    
+    def hash_file(self, filepath: str) -> str:
+        """SHA-256 of a file, streamed"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def compress_file(self, filepath: str, blob_path: str, compression: str):
+        """Stream-compress a file into the archive"""
+        tmp_path = f"{blob_path}.tmp"
+        with open(filepath, 'rb') as src:
+            if compression == 'zstd':
+                import zstandard
+                with open(tmp_path, 'wb') as dst:
+                    zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+            else:
+                with gzip.open(tmp_path, 'wb', compresslevel=9) as dst:
+                    shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, blob_path)
+    
+    def store_blob(self, index: Dict, filepath: str, sha256: str) -> bool:
+        """Add a file's content to the archive unless identical content is already stored"""
+        if sha256 in index['blobs']:
+            return False
+            
+        blob_name = f"{sha256}{COMPRESSION_EXTENSIONS[self.compression]}"
+        blob_path = os.path.join(self.archive_dir, blob_name)
+        self.compress_file(filepath, blob_path, self.compression)
+        
+        index['blobs'][sha256] = {
+            'path': os.path.join(ARCHIVE_DIRNAME, blob_name),
+            'compression': self.compression,
+            'size': os.path.getsize(filepath),
+            'compressed_size': os.path.getsize(blob_path)
+        }
+        return True
+    
+    def scan(self) -> List[Dict]:
+        """List artifacts in the data directory that are old enough to manage"""
+        artifacts = []
+        now = datetime.now().timestamp()
+        for name in sorted(os.listdir(self.data_dir)):
+            filepath = os.path.join(self.data_dir, name)
+            if name in EXCLUDED_FILES or name.endswith(SKIPPED_SUFFIXES) or not os.path.isfile(filepath):
+                continue
+                
+            mtime = os.path.getmtime(filepath)
+            if now - mtime < self.min_age_seconds:
+                continue
+                
+            created_at = datetime.fromtimestamp(mtime).isoformat()
+            artifacts.append({
+                'name': name,
+                'path': filepath,
+                'family': self.family_of(name),
+                'created_at': created_at,
+                'year': self.year_of(name, created_at)
+            })
+        return artifacts
+    
+    def archive(self, index: Dict, removals: List[str]) -> Dict:
+        """Snapshot every artifact; queue superseded timestamped files for removal from the live directory.
+        
+        Files are only queued here: they are deleted once the index referencing their
+        snapshots has been saved (see run).
+        """
+        stats = {'snapshots_added': 0, 'blobs_added': 0, 'files_removed': 0, 'bytes_freed': 0}
+        
+        artifacts = self.scan()
+        newest = {}
+        for artifact in artifacts:
+            current = newest.get(artifact['family'])
+            if current is None or artifact['created_at'] > current['created_at']:
+                newest[artifact['family']] = artifact
+        
+        known = {(s['name'], s['sha256']) for s in index['snapshots']}
+        for artifact in artifacts:
+            sha256 = self.hash_file(artifact['path'])
+            if (artifact['name'], sha256) not in known:
+                if self.store_blob(index, artifact['path'], sha256):
+                    stats['blobs_added'] += 1
+                index['snapshots'].append({
+                    'name': artifact['name'],
+                    'family': artifact['family'],
+                    'sha256': sha256,
+                    'year': artifact['year'],
+                    'created_at': artifact['created_at']
+                })
+                stats['snapshots_added'] += 1
+            
+            # Only the newest file of a family stays uncompressed for existing readers
+            if newest[artifact['family']] is not artifact:
+                stats['bytes_freed'] += os.path.getsize(artifact['path'])
+                removals.append(artifact['path'])
+                stats['files_removed'] += 1
+        
+        return stats
+    
+    def apply_policy(self, index: Dict, removals: List[str]) -> Dict:
+        """Keep the last N snapshots per family plus the newest per year; queue unreferenced blobs for removal"""
+        stats = {'snapshots_pruned': 0, 'blobs_deleted': 0, 'bytes_freed': 0}
+        
+        families = {}
+        for snapshot in index['snapshots']:
+            families.setdefault(snapshot['family'], []).append(snapshot)
+        
+        kept = []
+        for snapshots in families.values():
+            snapshots.sort(key=lambda s: s['created_at'], reverse=True)
+            per_year = {}
+            for position, snapshot in enumerate(snapshots):
+                year_count = per_year.get(snapshot['year'], 0)
+                if position < self.keep_last or year_count < self.keep_per_year:
+                    kept.append(snapshot)
+                    per_year[snapshot['year']] = year_count + 1
+        
+        stats['snapshots_pruned'] = len(index['snapshots']) - len(kept)
+        index['snapshots'] = sorted(kept, key=lambda s: (s['family'], s['created_at']))
+        
+        # Garbage-collect blobs no snapshot references any more
+        referenced = {s['sha256'] for s in kept}
+        for sha256 in list(index['blobs']):
+            if sha256 not in referenced:
+                blob = index['blobs'].pop(sha256)
+                blob_path = os.path.join(self.data_dir, blob['path'])
+                if os.path.exists(blob_path):
+                    stats['bytes_freed'] += os.path.getsize(blob_path)
+                    removals.append(blob_path)
+                stats['blobs_deleted'] += 1
+        
+        return stats
+    
+    def run(self) -> bool:
+        """Archive new artifacts and apply the retention policy"""
+        try:
+            logger.info(f"Applying retention to {self.data_dir} "
+                        f"(keep_last={self.keep_last}, keep_per_year={self.keep_per_year}, "
+                        f"compression={self.compression})")
+            
+            index = self.load_index()
+            removals = []
+            archive_stats = self.archive(index, removals)
+            policy_stats = self.apply_policy(index, removals)
+            
+            # Delete only after the saved index references every archived snapshot, so a
+            # failure or crash before this point never loses a superseded file
+            self.save_index(index)
+            for path in removals:
+                os.remove(path)
+            
+            logger.info(f"Retention archive: {archive_stats}")
+            logger.info(f"Retention policy: {policy_stats}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error applying retention: {e}")
+            return False
+    
+    def list_snapshots(self, name: str) -> List[Dict]:
+        """Snapshots for a file name or family, newest first"""
+        index = self.load_index()
+        snapshots = [s for s in index['snapshots'] if name in (s['name'], s['family'])]
+        return sorted(snapshots, key=lambda s: s['created_at'], reverse=True)
+    
+    def read_snapshot(self, name: str, as_of: Optional[str] = None) -> Optional[bytes]:
+        """Read a file's content, transparently from the archive if it was compressed away.
+        
+        With as_of (ISO timestamp), returns the newest snapshot taken at or before it.
+        """
+        live_path = os.path.join(self.data_dir, name)
+        if as_of is None and os.path.isfile(live_path):
+            with open(live_path, 'rb') as f:
+                return f.read()
+                
+        snapshots = [s for s in self.list_snapshots(name) if as_of is None or s['created_at'] <= as_of]
+        if not snapshots:
+            return None
+            
+        blob = self.load_index()['blobs'][snapshots[0]['sha256']]
+        blob_path = os.path.join(self.data_dir, blob['path'])
+        if blob['compression'] == 'zstd':
+            import zstandard
+            with open(blob_path, 'rb') as f:
+                return zstandard.ZstdDecompressor().stream_reader(f).read()
+        with gzip.open(blob_path, 'rb') as f:
+            return f.read()
+    
+    def open_snapshot(self, name: str, as_of: Optional[str] = None) -> Optional[io.BytesIO]:
+        """File-like access to read_snapshot, e.g. pd.read_csv(manager.open_snapshot(...))"""
+        content = self.read_snapshot(name, as_of)
+        return io.BytesIO(content) if content is not None else None
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/data-retention.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    try:
+        success = DataRetentionManager().run()
+        
+        if success:
+            print("✅ Data retention completed successfully")
+            exit(0)
+        else:
+            print("❌ Data retention failed")
+            exit(1)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
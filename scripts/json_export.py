@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+JSON Export
+Streams rent tables as compact JSON with precompressed variants, ETags and ZIP-prefix shards
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from rent_reconciliation import to_db_records
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 1000
+MANIFEST_FILENAME = 'manifest.json'
+
+# ETag suffix per Content-Encoding: each encoded variant is a different representation
+ENCODING_ETAG_SUFFIXES = {'gzip': 'gz', 'br': 'br'}
+
+# Shard key: first three ZIP digits (e.g. 021xx)
+SHARD_PREFIX_LENGTH = 3
+
+
+def iter_records(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict]:
+    """Yield JSON-safe records a chunk at a time instead of materializing the whole frame"""
+    for start in range(0, len(df), chunk_rows):
+        yield from to_db_records(df.iloc[start:start + chunk_rows])
+
+
+@functools.lru_cache(maxsize=None)
+def load_brotli():
+    """The brotli module, or None (warned about once per process) when it is not installed"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        logger.warning("brotli is not installed: JSON exports get no .br variants (pip install brotli)")
+        return None
+
+
+class CompressedWriter:
+    """Writes one byte stream to a file plus its .gz (and .br, if brotli is installed) variants"""
+    
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.raw = open(f"{filepath}.tmp", 'wb')
+        
+        # mtime=0 keeps the gzip bytes (and so their ETag) stable across identical exports
+        self.gzip_raw = open(f"{filepath}.gz.tmp", 'wb')
+        self.gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self.gzip_raw, compresslevel=9, mtime=0)
+        
+        brotli = load_brotli()
+        self.brotli = brotli.Compressor(quality=11) if brotli is not None else None
+        self.brotli_raw = open(f"{filepath}.br.tmp", 'wb') if brotli is not None else None
+    
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.digest.update(data)
+        self.size += len(data)
+        self.raw.write(data)
+        self.gzip.write(data)
+        if self.brotli is not None:
+            self.brotli_raw.write(self.brotli.process(data))
+    
+    def close(self) -> Dict:
+        """Finish all variants, move them into place and return their sizes and ETags"""
+        self.raw.close()
+        self.gzip.close()
+        self.gzip_raw.close()
+        variants = {'gzip': f"{self.filepath}.gz"}
+        if self.brotli is not None:
+            self.brotli_raw.write(self.brotli.finish())
+            self.brotli_raw.close()
+            variants['br'] = f"{self.filepath}.br"
+        elif os.path.exists(f"{self.filepath}.br"):
+            # A .br left by an earlier export would no longer match the file
+            os.remove(f"{self.filepath}.br")
+        
+        os.replace(f"{self.filepath}.tmp", self.filepath)
+        for path in variants.values():
+            os.replace(f"{path}.tmp", path)
+        
+        digest = self.digest.hexdigest()[:32]
+        return {
+            'etag': f'"{digest}"',
+            'bytes': self.size,
+            **{f'{encoding}_etag': f'"{digest}-{ENCODING_ETAG_SUFFIXES[encoding]}"' for encoding in variants},
+            **{f'{encoding}_bytes': os.path.getsize(path) for encoding, path in variants.items()}
+        }
+    
+    def abort(self):
+        """Drop partially written files"""
+        for handle in [self.gzip, self.raw, self.gzip_raw, self.brotli_raw]:
+            if handle is not None:
+                handle.close()
+        for suffix in ['', '.gz', '.br']:
+            if os.path.exists(f"{self.filepath}{suffix}.tmp"):
+                os.remove(f"{self.filepath}{suffix}.tmp")
+
+
+def write_json(filepath: str, header: Dict, records: Iterator[Dict], key: str = 'rents') -> Dict:
+    """Stream `{...header, key: [records]}` as compact JSON; returns the file's manifest entry"""
+    writer = CompressedWriter(filepath)
+    try:
+        head = json.dumps(header, separators=(',', ':'), default=str)
+        writer.write(f"{head[:-1]}{',' if header else ''}\"{key}\":[")
+        
+        rows = 0
+        for record in records:
+            writer.write(('' if rows == 0 else ',') + json.dumps(record, separators=(',', ':'), default=str))
+            rows += 1
+        writer.write(']}')
+        
+        return {'file': os.path.basename(filepath), 'rows': rows, **writer.close()}
+        
+    except Exception:
+        writer.abort()
+        raise
+
+
+def export_json(df: pd.DataFrame, filepath: str, header: Dict, shard: bool = True) -> Dict:
+    """Write the full export plus, with shard, one file per ZIP prefix and a manifest.
+    
+    Shards go to `<filepath without .json>/<prefix>xx.json` next to the full file.
+    """
+    df = df.sort_values('zip_code') if 'zip_code' in df.columns else df
+    full = write_json(filepath, header, iter_records(df))
+    logger.info(f"JSON export written: {filepath} ({full['bytes']} bytes, {full['rows']} rows)")
+    if not shard or 'zip_code' not in df.columns:
+        return {'full': full}
+        
+    shard_dir = os.path.splitext(filepath)[0]
+    tmp_dir = f"{shard_dir}.tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    
+    shards: List[Dict] = []
+    prefixes = df['zip_code'].astype(str).str.zfill(5).str[:SHARD_PREFIX_LENGTH]
+    for prefix, group in df.groupby(prefixes, sort=True):
+        name = f"{prefix}{'x' * (5 - SHARD_PREFIX_LENGTH)}"
+        entry = write_json(os.path.join(tmp_dir, f"{name}.json"), {**header, 'zip_prefix': name},
+                           iter_records(group))
+        shards.append({'zip_prefix': name, **entry})
+    
+    manifest = {
+        **header,
+        'generated_at': datetime.now().isoformat(),
+        'full': full,
+        'shard_prefix_length': SHARD_PREFIX_LENGTH,
+        'shards': shards
+    }
+    manifest['etag'] = '"' + hashlib.sha256(
+        json.dumps([full['etag']] + [s['etag'] for s in shards]).encode('utf-8')
+    ).hexdigest()[:32] + '"'
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    
+    # Swap the whole shard set at once so readers never mix shards from two exports: move the
+    # current set aside, move the new one in, and only then delete the old one
+    old_dir = f"{shard_dir}.old"
+    if os.path.exists(old_dir):
+        # Left behind by an interrupted export; os.replace cannot overwrite a non-empty directory
+        shutil.rmtree(old_dir)
+    if os.path.exists(shard_dir):
+        os.replace(shard_dir, old_dir)
+    try:
+        os.replace(tmp_dir, shard_dir)
+    except OSError:
+        if os.path.exists(old_dir):
+            os.replace(old_dir, shard_dir)
+        raise
+    shutil.rmtree(old_dir, ignore_errors=True)
+    
+    logger.info(f"JSON shards written: {len(shards)} files in {shard_dir}")
+    return manifest
+
+
+def shard_path(shard_dir: str, zip_code: str) -> str:
+    """Shard file that holds a ZIP code"""
+    prefix = str(zip_code).zfill(5)[:SHARD_PREFIX_LENGTH]
+    return os.path.join(shard_dir, f"{prefix}{'x' * (5 - SHARD_PREFIX_LENGTH)}.json")
+
+
+def load_manifest(shard_dir: str) -> Optional[Dict]:
+    """Read a shard set's manifest"""
+    manifest_path = os.path.join(shard_dir, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Nearest ZIP Rents Script
+Spatial fallback for ZIP codes without a canonical rent: blends the rents of the nearest covered ZIPs
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+# Deployed flat into /opt/rent-api, the scripts find data/ through RENT_JSON_DIR
+DATA_DIR = os.getenv('RENT_JSON_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+CENTROIDS_FILENAME = 'ma-zip-centroids.csv'
+
+# Census ZCTA gazetteer (internal points); the optional `zipcodes` package is an offline alternative
+CENTROID_SOURCES = ['gazetteer', 'zipcodes']
+GAZETTEER_URL = "https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_zcta_national.zip"
+
+# Massachusetts ZIP prefixes (010-027, plus 055 for Andover)
+MA_ZIP_PREFIXES = tuple(f"{p:03d}" for p in range(10, 28)) + ('055',)
+
+EARTH_RADIUS_KM = 6371.0088
+
+DEFAULT_K = 3
+MAX_DISTANCE_KM = 25.0
+IDW_POWER = 2.0
+
+# Neighbours closer than this are weighted as if they were this far away
+MIN_DISTANCE_KM = 0.5
+
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """Lat/lon in degrees to 3D unit vectors; chord distance between them is monotonic in great-circle distance"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Chord length on the unit sphere to great-circle kilometres"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(distance_km: float) -> float:
+    """Great-circle kilometres to chord length on the unit sphere"""
+    return 2 * np.sin(distance_km / (2 * EARTH_RADIUS_KM))
+
+
+def load_centroids(path: Optional[str] = None) -> pd.DataFrame:
+    """Load the bundled ZIP centroid file (zip_code, latitude, longitude)"""
+    path = path or os.getenv('ZIP_CENTROIDS_PATH', os.path.join(DATA_DIR, CENTROIDS_FILENAME))
+    centroids = pd.read_csv(path, dtype={'zip_code': str})
+    centroids['zip_code'] = centroids['zip_code'].str.zfill(5)
+    return centroids.dropna(subset=['latitude', 'longitude']).drop_duplicates('zip_code')
+
+
+def load_gazetteer_centroids(url: str = GAZETTEER_URL) -> pd.DataFrame:
+    """ZCTA internal points from the Census gazetteer (downloaded)"""
+    logger.info(f"Downloading ZCTA gazetteer from {url}")
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        with archive.open(archive.namelist()[0]) as f:
+            gazetteer = pd.read_csv(f, sep='\t', dtype={'GEOID': str})
+    gazetteer.columns = gazetteer.columns.str.strip()
+    
+    return pd.DataFrame({
+        'zip_code': gazetteer['GEOID'].str.zfill(5),
+        'latitude': gazetteer['INTPTLAT'],
+        'longitude': gazetteer['INTPTLONG']
+    })
+
+
+def load_zipcodes_centroids() -> pd.DataFrame:
+    """Active ZIP code points from the `zipcodes` package, which bundles its data (no download).
+    
+    Unlike the gazetteer it also places PO box and single-organization ZIPs.
+    """
+    try:
+        import zipcodes
+    except ImportError:
+        raise RuntimeError("The zipcodes source needs the zipcodes package (pip install zipcodes)")
+        
+    records = [z for z in zipcodes.filter_by(state='MA') if z.get('active')]
+    return pd.DataFrame({
+        'zip_code': [z['zip_code'] for z in records],
+        'latitude': pd.to_numeric([z['lat'] for z in records], errors='coerce'),
+        'longitude': pd.to_numeric([z['long'] for z in records], errors='coerce')
+    })
+
+
+def build_centroids(output_path: Optional[str] = None, source: str = 'gazetteer',
+                    url: str = GAZETTEER_URL) -> pd.DataFrame:
+    """Write the Massachusetts centroid file from the Census gazetteer or the zipcodes package"""
+    output_path = output_path or os.path.join(DATA_DIR, CENTROIDS_FILENAME)
+    if source not in CENTROID_SOURCES:
+        raise ValueError(f"Unknown centroid source: {source}")
+        
+    centroids = load_gazetteer_centroids(url) if source == 'gazetteer' else load_zipcodes_centroids()
+    centroids[['latitude', 'longitude']] = centroids[['latitude', 'longitude']].round(6)
+    centroids = centroids.dropna(subset=['latitude', 'longitude'])
+    centroids = centroids[centroids['zip_code'].str.startswith(MA_ZIP_PREFIXES)]
+    centroids = centroids.sort_values('zip_code').reset_index(drop=True)
+    
+    centroids.to_csv(output_path, index=False)
+    logger.info(f"Wrote {len(centroids)} ZIP centroids to {output_path}")
+    return centroids
+
+
+class NearestZipRentIndex:
+    """Nearest ZIP Rent Index Class
+    
+    One KD-tree per bedroom count over the centroids of ZIPs that have that rent,
+    so every neighbour a query returns can be blended.
+    """
+    
+    def __init__(self, centroids: pd.DataFrame, rents: pd.DataFrame, k: int = DEFAULT_K,
+                 max_distance_km: float = MAX_DISTANCE_KM, power: float = IDW_POWER):
+        self.k = k
+        self.max_distance_km = max_distance_km
+        self.power = power
+        self.centroids = centroids.set_index('zip_code')[['latitude', 'longitude']]
+        
+        rents = rents[['zip_code', 'bedrooms', 'rent']].dropna()
+        rents = rents.assign(zip_code=rents['zip_code'].astype(str).str.zfill(5),
+                             bedrooms=rents['bedrooms'].astype(int),
+                             rent=rents['rent'].astype(float))
+        self.rents = rents.drop_duplicates(['zip_code', 'bedrooms'])
+        
+        located = self.rents.join(self.centroids, on='zip_code', how='inner')
+        self.trees = {}
+        for bedrooms, group in located.groupby('bedrooms'):
+            self.trees[int(bedrooms)] = {
+                'tree': cKDTree(to_unit_vectors(group['latitude'], group['longitude'])),
+                'zip_codes': group['zip_code'].to_numpy(),
+                'rents': group['rent'].to_numpy()
+            }
+        
+        unlocated = self.rents['zip_code'].nunique() - located['zip_code'].nunique()
+        if unlocated:
+            logger.warning(f"{unlocated} ZIPs with rents have no centroid and cannot serve as neighbours")
+    
+    @classmethod
+    def from_canonical(cls, engine=None, centroids_path: Optional[str] = None, **kwargs) -> 'NearestZipRentIndex':
+        """Build the index over the canonical rent table"""
+        from rent_reconciliation import RentReconciliation
+        
+        rents = RentReconciliation(engine).get_rents()
+        return cls(load_centroids(centroids_path), rents, **kwargs)
+    
+    def bedroom_counts(self) -> List[int]:
+        """Bedroom counts the index can answer"""
+        return sorted(self.trees)
+    
+    def nearest(self, zip_codes: np.ndarray, bedrooms: int):
+        """Distance-weighted rent from the k nearest covered ZIPs, for many ZIPs at one bedroom count.
+        
+        Returns (rents, neighbor_zips, distance_km) arrays aligned with zip_codes; NaN/None where unresolved.
+        """
+        rents = np.full(len(zip_codes), np.nan)
+        neighbor_zips = np.full(len(zip_codes), None, dtype=object)
+        distance_km = np.full(len(zip_codes), np.nan)
+        
+        entry = self.trees.get(bedrooms)
+        points = self.centroids.reindex(zip_codes)
+        located = points['latitude'].notna().to_numpy()
+        if entry is None or not located.any():
+            return rents, neighbor_zips, distance_km
+            
+        k = min(self.k, len(entry['zip_codes']))
+        chords, positions = entry['tree'].query(
+            to_unit_vectors(points['latitude'].to_numpy()[located], points['longitude'].to_numpy()[located]),
+            k=k, distance_upper_bound=km_to_chord(self.max_distance_km)
+        )
+        chords = chords.reshape(-1, k)
+        positions = positions.reshape(-1, k)
+        
+        # Missing neighbours come back as inf distance with an out-of-range position
+        found = np.isfinite(chords)
+        distances = chord_to_km(np.where(found, chords, 0))
+        weights = np.where(found, 1 / np.maximum(distances, MIN_DISTANCE_KM) ** self.power, 0)
+        positions = np.where(found, positions, 0)
+        
+        weight_sums = weights.sum(axis=1)
+        resolved = weight_sums > 0
+        blended = (weights * entry['rents'][positions]).sum(axis=1) / np.where(resolved, weight_sums, 1)
+        
+        rents[located] = np.where(resolved, np.round(blended, 2), np.nan)
+        distance_km[located] = np.where(resolved, np.round(distances[:, 0], 2), np.nan)
+        neighbor_zips[located] = [','.join(zips[mask]) or None
+                                  for zips, mask in zip(entry['zip_codes'][positions], found)]
+        return rents, neighbor_zips, distance_km
+    
+    def lookup(self, queries: pd.DataFrame) -> pd.DataFrame:
+        """Rents for (zip_code, bedrooms) pairs: exact where covered, nearest-ZIP blend otherwise.
+        
+        `match` is 'exact', 'nearest' or None (no centroid or no covered ZIP within range).
+        """
+        pairs = pd.DataFrame({'zip_code': queries['zip_code'].astype(str).str.zfill(5).to_numpy(),
+                              'bedrooms': queries['bedrooms'].astype(int).to_numpy()})
+        
+        # Resolve each distinct pair once, then broadcast back to the queries
+        unique = pairs.drop_duplicates().reset_index(drop=True)
+        exact = self.rents.set_index(['zip_code', 'bedrooms'])['rent']
+        rents = np.array(exact.reindex(pd.MultiIndex.from_frame(unique)), dtype=float)
+        match = np.where(np.isnan(rents), None, 'exact').astype(object)
+        neighbor_zips = np.full(len(unique), None, dtype=object)
+        distance_km = np.where(np.isnan(rents), np.nan, 0.0)
+        
+        missing = np.flatnonzero(np.isnan(rents))
+        bedroom_values = unique['bedrooms'].to_numpy()[missing]
+        zip_values = unique['zip_code'].to_numpy()[missing]
+        for bedrooms in np.unique(bedroom_values):
+            positions = missing[bedroom_values == bedrooms]
+            nearest = self.nearest(zip_values[bedroom_values == bedrooms], int(bedrooms))
+            rents[positions], neighbor_zips[positions], distance_km[positions] = nearest
+            match[positions[~np.isnan(nearest[0])]] = 'nearest'
+        
+        unique['rent'] = rents
+        unique['match'] = match
+        unique['neighbor_zips'] = neighbor_zips
+        unique['distance_km'] = distance_km
+        result = pairs.merge(unique, on=['zip_code', 'bedrooms'], how='left')
+        result.index = queries.index
+        return result
+    
+    def estimate_listing_rents(self, listings: List[Dict]) -> pd.DataFrame:
+        """Rent per unit type for listings.json entries (LIST_NO, ZIP_CODE, UNIT_MIX)"""
+        rows = [
+            {'LIST_NO': listing.get('LIST_NO'), 'zip_code': listing.get('ZIP_CODE'),
+             'bedrooms': unit.get('bedrooms'), 'count': unit.get('count', 1)}
+            for listing in listings
+            for unit in listing.get('UNIT_MIX') or []
+            if listing.get('ZIP_CODE') and unit.get('bedrooms') is not None
+        ]
+        if not rows:
+            return pd.DataFrame(columns=['LIST_NO', 'zip_code', 'bedrooms', 'count', 'rent', 'match',
+                                         'neighbor_zips', 'distance_km'])
+        
+        units = pd.DataFrame(rows)
+        rents = self.lookup(units)
+        return pd.concat([units[['LIST_NO', 'count']], rents], axis=1)
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/nearest-zip-rents.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    parser = argparse.ArgumentParser(description='Nearest ZIP rent fallback')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build_parser = subparsers.add_parser('build-centroids', help='Regenerate the bundled MA ZIP centroid file')
+    build_parser.add_argument('--output', default=None)
+    build_parser.add_argument('--source', choices=CENTROID_SOURCES, default='gazetteer',
+                              help='Census gazetteer (download) or the zipcodes package (offline)')
+    
+    listings_parser = subparsers.add_parser('listings', help='Estimate unit rents for every listing')
+    listings_parser.add_argument('--listings', default=os.path.join(DATA_DIR, 'listings.json'))
+    listings_parser.add_argument('--output', default=None, help='Write per-unit rents as JSON')
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.command == 'build-centroids':
+            centroids = build_centroids(args.output, args.source)
+            print(f"✅ Wrote {len(centroids)} ZIP centroids")
+            exit(0)
+        
+        with open(args.listings, 'r') as f:
+            listings = json.load(f)['listings']
+        
+        index = NearestZipRentIndex.from_canonical()
+        started = time.perf_counter()
+        units = index.estimate_listing_rents(listings)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        counts = units['match'].fillna('none').value_counts().to_dict()
+        logger.info(f"Estimated {len(units)} unit rents in {elapsed_ms:.1f} ms: {counts}")
+        
+        if args.output:
+            units.to_json(args.output, orient='records', indent=2)
+            logger.info(f"Unit rents saved to: {args.output}")
+        
+        print(f"✅ Estimated rents for {len(units)} unit types ({counts.get('nearest', 0)} from nearest ZIPs)")
+        exit(0)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Pipeline Profiler
+Per-stage cProfile, tracemalloc and stack-sampling reports for pipeline runs (--profile)
+"""
+
+import cProfile
+import contextlib
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ROOT = "/opt/rent-api/profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 15
+
+
+class StackSampler:
+    """Samples one thread's stack on an interval into flamegraph collapsed-stack counts"""
+    
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+    
+    def run(self):
+        """Record the target thread's stack until stopped"""
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+    
+    def start(self):
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+    
+    def write(self, filepath: str):
+        """Write stacks in the collapsed format read by flamegraph.pl / speedscope"""
+        with open(filepath, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class PipelineProfiler:
+    """Pipeline Profiler Class
+    
+    Disabled profilers hand out a shared null context per stage, so a pipeline
+    run without --profile pays only for one method call per stage.
+    """
+    
+    def __init__(self, name: str, enabled: bool = True, run_dir: Optional[str] = None, top_n: int = TOP_N):
+        self.name = name
+        self.enabled = enabled
+        self.top_n = top_n
+        self.stages: List[Dict] = []
+        self.run_dir = None
+        
+        if enabled:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            root = os.getenv('PIPELINE_PROFILE_DIR', PROFILE_ROOT)
+            self.run_dir = run_dir or os.path.join(root, f"{name}_{timestamp}")
+            
+            # Create run directory if it doesn't exist
+            os.makedirs(self.run_dir, exist_ok=True)
+            logger.info(f"Profiling {name}, reports in {self.run_dir}")
+    
+    @classmethod
+    def disabled(cls) -> 'PipelineProfiler':
+        return cls('disabled', enabled=False)
+    
+    def stage(self, stage_name: str):
+        """Context manager wrapping one pipeline stage"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self.profile_stage(stage_name)
+    
+    @contextlib.contextmanager
+    def profile_stage(self, stage_name: str):
+        prefix = os.path.join(self.run_dir, f"{len(self.stages) + 1:02d}_{stage_name}")
+        
+        # Leave tracing alone if something else (e.g. python -X tracemalloc) started it
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        sampler = StackSampler(threading.get_ident())
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            
+            profiler.dump_stats(f"{prefix}.pstats")
+            sampler.write(f"{prefix}.collapsed")
+            self.write_allocations(snapshot, f"{prefix}.allocations.txt")
+            
+            stats = pstats.Stats(profiler)
+            self.stages.append({
+                'name': stage_name,
+                'elapsed': elapsed,
+                'peak_bytes': peak,
+                'retained_bytes': current,
+                'hottest': self.hottest_functions(stats, 5)
+            })
+    
+    def write_allocations(self, snapshot: tracemalloc.Snapshot, filepath: str):
+        """Write the top allocation sites still alive at the end of a stage"""
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+        with open(filepath, 'w') as f:
+            for stat in snapshot.statistics('traceback')[:self.top_n]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(limit=5):
+                    f.write(f"{line}\n")
+                f.write("\n")
+    
+    def hottest_functions(self, stats: pstats.Stats, limit: int) -> List[str]:
+        """Top functions by cumulative time as printable lines"""
+        rows = []
+        for (filename, lineno, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append((cumulative, total, calls, f"{os.path.basename(filename)}:{lineno}({function})"))
+        rows.sort(reverse=True)
+        return [f"{cumulative:8.3f}s cum {total:8.3f}s self {calls:>8} calls  {label}"
+                for cumulative, total, calls, label in rows[:limit]]
+    
+    def report(self) -> str:
+        """Write and log a short summary of every profiled stage"""
+        if not self.enabled:
+            return ""
+            
+        output = io.StringIO()
+        output.write(f"Profile summary for {self.name} ({self.run_dir})\n")
+        for stage in self.stages:
+            output.write(f"\n[{stage['name']}] {stage['elapsed']:.2f}s, "
+                         f"peak {stage['peak_bytes'] / 1024 / 1024:.1f} MiB, "
+                         f"retained {stage['retained_bytes'] / 1024 / 1024:.1f} MiB\n")
+            for line in stage['hottest']:
+                output.write(f"  {line}\n")
+        
+        summary = output.getvalue()
+        with open(os.path.join(self.run_dir, 'summary.txt'), 'w') as f:
+            f.write(summary)
+        print(summary)
+        return summary
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Pipeline Scheduler Script
+Resident daemon that runs data source refreshes when data_sources.sync_frequency says they are due
+"""
+
+import argparse
+import logging
+import os
+import random
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Imported up front so every run reuses the already-loaded libraries
+import pandas  # noqa: F401
+import requests  # noqa: F401
+
+from pipeline_jobs import PIPELINE_SOURCES, PipelineJobQueue, PipelineWorker, load_pipeline
+
+logger = logging.getLogger(__name__)
+
+FREQUENCY_INTERVALS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30)
+}
+
+# A source whose job exhausted its retries waits this long (or its interval, if shorter)
+FAILURE_COOLDOWN = timedelta(hours=1)
+
+TICK_SECONDS = 60
+
+
+class PipelineScheduler:
+    """Pipeline Scheduler Class"""
+    
+    def __init__(self, engine=None, max_concurrency: int = 2, jitter_seconds: int = 300,
+                 tick_seconds: int = TICK_SECONDS):
+        self.queue = PipelineJobQueue(engine)
+        self.max_concurrency = max_concurrency
+        self.jitter_seconds = jitter_seconds
+        self.tick_seconds = tick_seconds
+        self.stop_event = threading.Event()
+        self.workers: List[PipelineWorker] = []
+    
+    def load_sources(self) -> List[Dict]:
+        """Active data sources with a schedulable frequency and a registered pipeline"""
+        from sqlalchemy import text
+        
+        with self.queue.get_engine().connect() as conn:
+            rows = conn.execute(text("""
+                SELECT s.id, s.name, s.sync_frequency, s.last_sync_at,
+                       (SELECT MAX(j.completed_at) FROM pipeline_jobs j
+                        WHERE j.source_id = s.id AND j.status = 'failed') AS last_failed_at,
+                       EXISTS (SELECT 1 FROM pipeline_jobs j
+                               WHERE j.source_id = s.id AND j.status IN ('queued', 'running')) AS pending
+                FROM data_sources s
+                WHERE s.is_active AND s.sync_frequency = ANY(:frequencies)
+            """), {'frequencies': list(FREQUENCY_INTERVALS)}).mappings().fetchall()
+        
+        return [dict(row) for row in rows if row['name'] in PIPELINE_SOURCES]
+    
+    def is_due(self, source: Dict, now: datetime) -> bool:
+        """Whether a source's last sync is older than its sync_frequency"""
+        if source['pending']:
+            return False
+            
+        interval = FREQUENCY_INTERVALS[source['sync_frequency']]
+        if source['last_sync_at'] is not None and source['last_sync_at'] + interval > now:
+            return False
+            
+        last_failed_at = source['last_failed_at']
+        if last_failed_at is not None and (source['last_sync_at'] is None or last_failed_at > source['last_sync_at']):
+            return last_failed_at + min(interval, FAILURE_COOLDOWN) <= now
+        return True
+    
+    def tick(self) -> int:
+        """Enqueue every due source (with jitter); returns how many were enqueued"""
+        try:
+            from sqlalchemy import text
+            
+            with self.queue.get_engine().connect() as conn:
+                now = conn.execute(text("SELECT NOW()::timestamp")).scalar()
+            
+            enqueued = 0
+            for source in self.load_sources():
+                if not self.is_due(source, now):
+                    continue
+                    
+                # Spread sources that fall due together
+                delay = random.randint(0, self.jitter_seconds) if self.jitter_seconds else 0
+                if self.queue.enqueue(source['name'], delay_seconds=delay) is not None:
+                    logger.info(f"{source['name']} is due ({source['sync_frequency']}), starts in {delay}s")
+                    enqueued += 1
+            return enqueued
+            
+        except Exception as e:
+            logger.error(f"Scheduler tick failed: {e}")
+            return 0
+    
+    def warm_up(self):
+        """Load every pipeline module once so runs do not pay for imports"""
+        for source_name in PIPELINE_SOURCES:
+            try:
+                load_pipeline(source_name)
+            except Exception as e:
+                logger.error(f"Could not load pipeline for {source_name}: {e}")
+    
+    def start_workers(self) -> List[threading.Thread]:
+        """Start max_concurrency worker threads sharing the scheduler's connection pool"""
+        threads = []
+        for i in range(self.max_concurrency):
+            worker = PipelineWorker(self.queue, poll_interval=min(self.tick_seconds, 10))
+            self.workers.append(worker)
+            thread = threading.Thread(target=worker.run, name=f"pipeline-worker-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+    
+    def run(self):
+        """Tick until stopped, running due sources on the embedded workers"""
+        logger.info(f"Starting pipeline scheduler (concurrency={self.max_concurrency}, "
+                    f"jitter={self.jitter_seconds}s, tick={self.tick_seconds}s)")
+        self.warm_up()
+        threads = self.start_workers()
+        
+        while not self.stop_event.is_set():
+            self.tick()
+            self.stop_event.wait(self.tick_seconds)
+        
+        logger.info("Stopping pipeline scheduler, waiting for running jobs...")
+        for worker in self.workers:
+            worker.stop_event.set()
+        for thread in threads:
+            thread.join()
+        for worker in self.workers:
+            worker.stop()
+    
+    def stop(self, signum: Optional[int] = None, frame=None):
+        """Signal handler: finish running jobs and exit"""
+        self.stop_event.set()
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/pipeline-scheduler.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    parser = argparse.ArgumentParser(description='Pipeline scheduler daemon')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('PIPELINE_CONCURRENCY', '2')))
+    parser.add_argument('--jitter', type=int, default=int(os.getenv('PIPELINE_JITTER_SECONDS', '300')))
+    parser.add_argument('--tick', type=int, default=TICK_SECONDS)
+    args = parser.parse_args()
+    
+    try:
+        scheduler = PipelineScheduler(max_concurrency=args.concurrency, jitter_seconds=args.jitter,
+                                      tick_seconds=args.tick)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        scheduler.run()
+        
+        print("✅ Pipeline scheduler stopped")
+        exit(0)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Rent Refresh Script
+Runs the post-load steps that keep derived rent tables in step with `rents`
+"""
+
+import pandas as pd
+import logging
+from typing import List, Optional
+
+from rent_reconciliation import RentReconciliation
+from rent_aggregates import RentAggregates
+from rent_change_feed import RentChangeFeed
+from listing_dependencies import refresh_affected_listings
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_rent_tables(zip_codes: Optional[List[str]] = None, engine=None) -> Optional[pd.DataFrame]:
+    """Reconcile rents for the given zip codes (all when None) and update derived tables.
+    
+    Returns the changed canonical cells, or None when reconciliation or a derived table
+    update failed. Canonical changes are committed first, so a later refresh finds no diff
+    to redo; a failure here must be reported for a manual rebuild.
+    """
+    # The change feed is written in the canonical upsert's transaction, so a failed
+    # publish rolls the cells back and fails the refresh
+    reconciliation = RentReconciliation(engine)
+    changes = reconciliation.refresh(zip_codes, outbox=RentChangeFeed(reconciliation.get_engine()))
+    if changes is None:
+        return None
+        
+    if changes.empty:
+        logger.info("Canonical rents unchanged, derived tables are up to date")
+        return changes
+        
+    # County / market tier statistics for the groups those cells belong to (all groups
+    # when the targeted update fails)
+    aggregates = RentAggregates(reconciliation.get_engine())
+    if not aggregates.update(changes):
+        logger.warning("Targeted rent aggregate update failed, rebuilding all groups")
+        if not aggregates.rebuild():
+            logger.error("Rent aggregates are stale; run rent_aggregates.py to rebuild them")
+            return None
+    
+    # Re-underwrite only the listings priced off those cells (screening index rows, analysis cache)
+    if refresh_affected_listings(changes, reconciliation.get_engine()) is None:
+        logger.error("Screening index and analysis cache are stale for the changed rent cells; "
+                     "run screening_index.py build and analysis_cache.py")
+        return None
+    
+    return changes
+
+
+def reconcile_rents(df: pd.DataFrame, full: bool = False, engine=None) -> bool:
+    """Refresh canonical rents and derived tables for the zip codes just loaded (all when full)"""
+    try:
+        zip_codes = None if full or 'zip_code' not in df.columns else df['zip_code'].unique()
+        changes = refresh_rent_tables(zip_codes, engine)
+        if changes is None:
+            logger.error("Rent reconciliation failed")
+            return False
+        
+        logger.info(f"Rent reconciliation changed {len(changes)} canonical cells")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error reconciling rents: {e}")
+        return False
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/rent-refresh.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    try:
+        changes = refresh_rent_tables()
+        
+        if changes is not None:
+            print(f"✅ Rent refresh completed ({len(changes)} cells changed)")
+            exit(0)
+        else:
+            print("❌ Rent refresh failed")
+            exit(1)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
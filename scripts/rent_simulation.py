@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Rent Simulation Script
+Monte Carlo vacancy, rent-growth and expense shocks over the listing inventory using canonical BHA rents
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Deployed flat into /opt/rent-api, the scripts find data/ through RENT_JSON_DIR
+DATA_DIR = os.getenv('RENT_JSON_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+DEFAULT_ASSUMPTIONS = {
+    # Operating expenses (same defaults as the API's analysis endpoint)
+    'water_sewer_per_unit': 400,
+    'common_elec_monthly': 100,
+    'rubbish_monthly': 200,
+    'pm_rate': 0.08,
+    'repairs_rate': 0.02,
+    'legal_rate': 0.01,
+    'capex_rate': 0.01,
+    
+    # Financing (sized once on the unshocked NOI, as the API does)
+    'ltv_max': 0.80,
+    'interest_rate': 0.065,
+    'amort_years': 30,
+    'dscr_floor': 1.20,
+    
+    # Rent growth: one market-wide draw per scenario plus a per-listing deviation
+    'rent_growth_mean': 0.03,
+    'rent_growth_market_sd': 0.03,
+    'rent_growth_local_sd': 0.02,
+    
+    # Vacancy ~ Beta with this mean (ANALYSIS_CONFIG.DEFAULT_VACANCY_RATE) and concentration
+    'vacancy_mean': 0.02,
+    'vacancy_concentration': 20.0,
+    
+    # Expense inflation per scenario plus a per-listing lognormal shock
+    'expense_inflation_mean': 0.04,
+    'expense_inflation_sd': 0.02,
+    'expense_local_sd': 0.08
+}
+
+
+def annual_debt_service(loan: np.ndarray, rate: float, amort_years: int) -> np.ndarray:
+    """Level annual payment on a fully amortizing monthly loan"""
+    i = rate / 12
+    n = amort_years * 12
+    if i == 0:
+        return loan / n * 12
+    return loan * (i * (1 + i) ** n) / ((1 + i) ** n - 1) * 12
+
+
+def loan_from_debt_service(debt_service: np.ndarray, rate: float, amort_years: int) -> np.ndarray:
+    """Loan amount an annual payment supports (inverse of annual_debt_service)"""
+    i = rate / 12
+    n = amort_years * 12
+    monthly = debt_service / 12
+    if i == 0:
+        return monthly * n
+    return monthly * (1 - (1 + i) ** -n) / i
+
+
+def simulate_chunk(task: Dict) -> Dict[str, np.ndarray]:
+    """Simulate all scenarios for one chunk of listings as (scenarios x listings) arrays.
+    
+    Only per-listing percentiles leave the worker, so memory is bounded by the chunk size.
+    """
+    inputs, market, assumptions = task['inputs'], task['market'], task['assumptions']
+    rng = np.random.default_rng(task['seed'])
+    shape = (len(market['rent_growth']), len(inputs['annual_gross']))
+    
+    # Collected rent: market and local growth, less vacancy
+    collected = rng.normal(0, assumptions['rent_growth_local_sd'], shape)
+    collected += 1 + market['rent_growth'][:, None]
+    np.maximum(collected, 0, out=collected)
+    collected *= inputs['annual_gross']
+    
+    mean, concentration = assumptions['vacancy_mean'], assumptions['vacancy_concentration']
+    collected *= 1 - rng.beta(mean * concentration, (1 - mean) * concentration, shape)
+    
+    # Fixed and rent-proportional expenses, both shocked
+    sigma = assumptions['expense_local_sd']
+    opex = inputs['pct_opex_rate'] * collected
+    opex += inputs['fixed_opex']
+    opex *= rng.lognormal(-sigma ** 2 / 2, sigma, shape)
+    opex *= 1 + market['expense_inflation'][:, None]
+    
+    noi = collected
+    noi -= opex
+    del opex
+    
+    cash_flow_negative = (noi < inputs['debt_service']).mean(axis=0)
+    
+    # Cash flow and cap rate are monotonic in NOI per listing, so one sort serves all three
+    noi_bands = np.percentile(noi, PERCENTILES, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cap_rate_bands = np.where(inputs['price'] > 0, noi_bands / inputs['price'], np.nan)
+    
+    return {
+        'noi': noi_bands,
+        'cash_flow': noi_bands - inputs['debt_service'],
+        'cap_rate': cap_rate_bands,
+        'prob_negative_cash_flow': cash_flow_negative
+    }
+
+
+class RentSimulation:
+    """Rent Simulation Class"""
+    
+    def __init__(self, scenarios: int = 10000, seed: Optional[int] = None, assumptions: Optional[Dict] = None,
+                 chunk_size: int = 100, workers: int = 1, engine=None, nearest_fallback: bool = False):
+        self.scenarios = scenarios
+        self.seed = seed
+        self.assumptions = {**DEFAULT_ASSUMPTIONS, **(assumptions or {})}
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.engine = engine
+        self.nearest_fallback = nearest_fallback
+    
+    def load_listings(self, filepath: str) -> List[Dict]:
+        """Load listings from a listings.json file"""
+        with open(filepath, 'r') as f:
+            return json.load(f)['listings']
+    
+    def unit_mix(self, listing: Dict) -> List[Dict]:
+        """Listing unit mix, derived from unit and bedroom counts when missing (as the API does)"""
+        unit_mix = listing.get('UNIT_MIX') or []
+        total_units = listing.get('UNITS_FINAL') or 0
+        if unit_mix or total_units <= 0:
+            return unit_mix
+            
+        total_bedrooms = listing.get('NO_UNITS_MF') or total_units * 2
+        floor_avg = int(total_bedrooms // total_units)
+        remainder = int(total_bedrooms - floor_avg * total_units)
+        
+        unit_mix = []
+        if floor_avg > 0:
+            unit_mix.append({'bedrooms': floor_avg, 'count': total_units - remainder})
+        if remainder > 0:
+            unit_mix.append({'bedrooms': floor_avg + 1, 'count': remainder})
+        return unit_mix or [{'bedrooms': 2, 'count': total_units}]
+    
+    def load_rents(self, zip_codes: List[str]) -> pd.DataFrame:
+        """Canonical rents for the listing ZIPs"""
+        from rent_reconciliation import RentReconciliation
+        
+        rents = RentReconciliation(self.engine).get_rents(zip_codes, nearest_fallback=self.nearest_fallback)
+        return rents[['zip_code', 'bedrooms', 'rent']]
+    
+    def prepare(self, listings: List[Dict], rents: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Per-listing base gross, expenses and debt service"""
+        a = self.assumptions
+        properties = pd.DataFrame([{
+            'LIST_NO': listing.get('LIST_NO'),
+            'ADDRESS': listing.get('ADDRESS'),
+            'TOWN': listing.get('TOWN'),
+            'ZIP_CODE': str(listing.get('ZIP_CODE') or '').strip().zfill(5),
+            'LIST_PRICE': float(listing.get('LIST_PRICE') or 0),
+            'TAXES': float(listing.get('TAXES') or 0),
+            'units': listing.get('UNITS_FINAL') or 0
+        } for listing in listings])
+        
+        units = pd.DataFrame([
+            {'LIST_NO': listing.get('LIST_NO'), 'bedrooms': int(unit.get('bedrooms') or 0),
+             'count': unit.get('count') or 0}
+            for listing in listings for unit in self.unit_mix(listing)
+        ], columns=['LIST_NO', 'bedrooms', 'count'])
+        units = units.merge(properties[['LIST_NO', 'ZIP_CODE']], on='LIST_NO')
+        
+        if rents is None:
+            rents = self.load_rents(properties['ZIP_CODE'].unique().tolist())
+        units = units.merge(rents.rename(columns={'zip_code': 'ZIP_CODE'}), on=['ZIP_CODE', 'bedrooms'], how='left')
+        units['monthly_rent'] = units['rent'].fillna(0) * units['count']
+        units['missing'] = units['rent'].isna() * units['count']
+        
+        totals = units.groupby('LIST_NO')[['monthly_rent', 'missing']].sum()
+        properties = properties.join(totals, on='LIST_NO')
+        properties['monthly_gross'] = properties.pop('monthly_rent').fillna(0)
+        properties['units_without_rent'] = properties.pop('missing').fillna(0).astype(int)
+        
+        properties['fixed_opex'] = (a['water_sewer_per_unit'] * properties['units']
+                                    + a['common_elec_monthly'] * 12
+                                    + np.where(properties['units'] >= 5, a['rubbish_monthly'] * 12, 0)
+                                    + properties['TAXES'])
+        properties['pct_opex_rate'] = a['pm_rate'] + a['repairs_rate'] + a['legal_rate'] + a['capex_rate']
+        
+        annual_gross = properties['monthly_gross'] * 12
+        base_noi = annual_gross * (1 - properties['pct_opex_rate']) - properties['fixed_opex']
+        loan_by_dscr = loan_from_debt_service(np.maximum(base_noi, 0) / a['dscr_floor'],
+                                              a['interest_rate'], a['amort_years'])
+        loan = np.clip(np.minimum(properties['LIST_PRICE'] * a['ltv_max'], loan_by_dscr), 0, None)
+        properties['debt_service'] = annual_debt_service(loan, a['interest_rate'], a['amort_years'])
+        properties['base_noi'] = base_noi
+        return properties
+    
+    def draw_market_shocks(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Scenario-wide draws shared by every listing"""
+        a = self.assumptions
+        return {
+            'rent_growth': rng.normal(a['rent_growth_mean'], a['rent_growth_market_sd'], self.scenarios),
+            'expense_inflation': rng.normal(a['expense_inflation_mean'], a['expense_inflation_sd'], self.scenarios)
+        }
+    
+    def run(self, listings: List[Dict], rents: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Simulate every listing; returns percentile cash flow, NOI and cap-rate bands per listing.
+        
+        Results are reproducible for a given seed and chunk_size, whatever the worker count.
+        """
+        started = time.perf_counter()
+        properties = self.prepare(listings, rents)
+        
+        seed_sequence = np.random.SeedSequence(self.seed)
+        market_seed, *chunk_seeds = seed_sequence.spawn(1 + -(-len(properties) // self.chunk_size))
+        market = self.draw_market_shocks(np.random.default_rng(market_seed))
+        
+        tasks = []
+        for position, chunk_seed in enumerate(chunk_seeds):
+            chunk = properties.iloc[position * self.chunk_size:(position + 1) * self.chunk_size]
+            tasks.append({
+                'inputs': {
+                    'annual_gross': chunk['monthly_gross'].to_numpy() * 12,
+                    'fixed_opex': chunk['fixed_opex'].to_numpy(),
+                    'pct_opex_rate': chunk['pct_opex_rate'].to_numpy(),
+                    'debt_service': chunk['debt_service'].to_numpy(),
+                    'price': chunk['LIST_PRICE'].to_numpy()
+                },
+                'market': market,
+                'assumptions': self.assumptions,
+                'seed': chunk_seed
+            })
+        
+        if self.workers > 1 and len(tasks) > 1:
+            with multiprocessing.Pool(min(self.workers, len(tasks))) as pool:
+                results = pool.map(simulate_chunk, tasks)
+        else:
+            results = [simulate_chunk(task) for task in tasks]
+        
+        summary = properties[['LIST_NO', 'ADDRESS', 'TOWN', 'ZIP_CODE', 'LIST_PRICE', 'units',
+                              'units_without_rent', 'monthly_gross', 'base_noi', 'debt_service']].copy()
+        for metric in ['cash_flow', 'noi', 'cap_rate']:
+            bands = np.concatenate([r[metric] for r in results], axis=1) if results else np.empty((len(PERCENTILES), 0))
+            for position, percentile in enumerate(PERCENTILES):
+                summary[f'{metric}_p{percentile}'] = bands[position]
+        summary['prob_negative_cash_flow'] = np.concatenate([r['prob_negative_cash_flow'] for r in results]) \
+            if results else np.empty(0)
+        
+        logger.info(f"Simulated {self.scenarios} scenarios x {len(summary)} listings "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return summary
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/rent-simulation.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    parser = argparse.ArgumentParser(description='Monte Carlo rent sensitivity simulation')
+    parser.add_argument('--listings', default=os.path.join(DATA_DIR, 'listings.json'))
+    parser.add_argument('--scenarios', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1, help='Processes to spread listing chunks over')
+    parser.add_argument('--chunk-size', type=int, default=100, help='Listings per simulation chunk')
+    parser.add_argument('--nearest-fallback', action='store_true', help='Fill uncovered ZIPs from nearest ZIPs')
+    parser.add_argument('--output', default=None, help='Write per-listing bands as JSON')
+    args = parser.parse_args()
+    
+    try:
+        simulation = RentSimulation(scenarios=args.scenarios, seed=args.seed, chunk_size=args.chunk_size,
+                                    workers=args.workers, nearest_fallback=args.nearest_fallback)
+        summary = simulation.run(simulation.load_listings(args.listings))
+        
+        if args.output:
+            summary.to_json(args.output, orient='records', indent=2)
+            logger.info(f"Simulation results saved to: {args.output}")
+        
+        print(f"✅ Simulated {args.scenarios} scenarios for {len(summary)} listings")
+        exit(0)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
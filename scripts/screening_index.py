@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Screening Index Script
+Presorted listing metrics, partitioned by town, ZIP and unit bucket, for fast top-K, range and percentile queries
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from rent_simulation import DATA_DIR, RentSimulation
+from town_normalization import get_normalizer
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.getenv('SCREENING_INDEX_PATH', os.path.join(DATA_DIR, 'screening-index.npz'))
+
+# Same buckets as UNIT_RANGES in packages/web/src/lib/comp-analysis.ts (plus one for single units)
+UNIT_BUCKET_EDGES = [2, 3, 5, 11]
+UNIT_BUCKETS = ['1', '2', '3-4', '5-10', '11+']
+
+METRICS = ['cap_rate', 'rent_to_price', 'gross_yield', 'cash_flow', 'price_per_unit']
+
+LISTING_COLUMNS = ['LIST_NO', 'ADDRESS', 'TOWN', 'ZIP_CODE', 'unit_bucket', 'LIST_PRICE', 'units',
+                   'monthly_gross', 'base_noi', 'units_without_rent']
+TEXT_COLUMNS = ['LIST_NO', 'ADDRESS', 'TOWN', 'ZIP_CODE', 'unit_bucket']
+
+PARTITION_COLUMNS = ['TOWN', 'ZIP_CODE', 'unit_bucket']
+
+# Listings ingested by listing_ingestion.py (off-market rows are left out of the index)
+LISTINGS_TABLE = 'listings'
+OFF_MARKET_STATUS = 'off_market'
+
+
+def unit_bucket(units: pd.Series) -> pd.Series:
+    """Unit-count bucket label per listing"""
+    positions = np.digitize(pd.to_numeric(units, errors='coerce').fillna(0), UNIT_BUCKET_EDGES)
+    return pd.Series(np.array(UNIT_BUCKETS, dtype=object)[positions], index=units.index)
+
+
+def listing_metrics(properties: pd.DataFrame) -> pd.DataFrame:
+    """Screening metrics from RentSimulation.prepare's base (unshocked) figures"""
+    df = properties.copy()
+    price = df['LIST_PRICE'].where(df['LIST_PRICE'] > 0)
+    rented = df['monthly_gross'] > 0
+    
+    df['cap_rate'] = (df['base_noi'] / price).where(rented)
+    df['rent_to_price'] = (df['monthly_gross'] / price).where(rented)
+    df['gross_yield'] = (df['monthly_gross'] * 12 / price).where(rented)
+    df['cash_flow'] = (df['base_noi'] - df['debt_service']).where(rented)
+    df['price_per_unit'] = price / df['units'].where(df['units'] > 0)
+    
+    df['TOWN'] = get_normalizer().normalize(df['TOWN'])[0].fillna('')
+    df['unit_bucket'] = unit_bucket(df['units'])
+    return df
+
+
+def sorted_percentile(values: np.ndarray, q: float) -> float:
+    """np.percentile (linear) for an already sorted array, in O(1)"""
+    if len(values) == 0:
+        return float('nan')
+    position = q / 100 * (len(values) - 1)
+    low = int(np.floor(position))
+    high = min(low + 1, len(values) - 1)
+    return float(values[low] + (values[high] - values[low]) * (position - low))
+
+
+class ScreeningIndex:
+    """Screening Index Class
+    
+    For each metric, listing rows are sorted by (partition, value) into one array with
+    partition offsets (CSR layout), plus one globally sorted array for unfiltered queries.
+    A query binary-searches the value range inside each selected partition and merges
+    at most k candidates per partition, so its cost follows the partitions touched, not
+    the inventory size.
+    """
+    
+    def __init__(self, listings: pd.DataFrame, partition_codes: np.ndarray, partitions: pd.DataFrame,
+                 rows: Dict[str, np.ndarray], values: Dict[str, np.ndarray], offsets: Dict[str, np.ndarray],
+                 global_rows: Dict[str, np.ndarray], global_values: Dict[str, np.ndarray]):
+        self.listings = listings
+        self.partition_codes = partition_codes
+        self.partitions = partitions
+        self.rows = rows
+        self.values = values
+        self.offsets = offsets
+        self.global_rows = global_rows
+        self.global_values = global_values
+    
+    @classmethod
+    def build(cls, metrics: pd.DataFrame) -> 'ScreeningIndex':
+        """Index a frame from listing_metrics()"""
+        listings = metrics[LISTING_COLUMNS + METRICS].reset_index(drop=True)
+        codes, uniques = pd.MultiIndex.from_frame(listings[PARTITION_COLUMNS].fillna('')).factorize()
+        partitions = uniques.to_frame(index=False, name=PARTITION_COLUMNS)
+        codes = codes.astype(np.int32)
+        
+        rows, values, offsets, global_rows, global_values = {}, {}, {}, {}, {}
+        for metric in METRICS:
+            metric_values = listings[metric].to_numpy(dtype=float)
+            valid = np.flatnonzero(np.isfinite(metric_values))
+            
+            order = valid[np.lexsort((metric_values[valid], codes[valid]))]
+            rows[metric] = order.astype(np.int32)
+            values[metric] = metric_values[order]
+            offsets[metric] = np.searchsorted(codes[order], np.arange(len(partitions) + 1)).astype(np.int64)
+            
+            order = valid[np.argsort(metric_values[valid], kind='stable')]
+            global_rows[metric] = order.astype(np.int32)
+            global_values[metric] = metric_values[order]
+        
+        return cls(listings, codes, partitions, rows, values, offsets, global_rows, global_values)
+    
+    def replace(self, list_nos: Iterable[str], metrics: Optional[pd.DataFrame] = None) -> 'ScreeningIndex':
+        """New index without the given listings' rows, plus their recomputed rows from listing_metrics()"""
+        kept = self.listings[~self.listings['LIST_NO'].isin({str(list_no) for list_no in list_nos})]
+        if metrics is None or metrics.empty:
+            return ScreeningIndex.build(kept)
+        return ScreeningIndex.build(pd.concat([kept, metrics[LISTING_COLUMNS + METRICS]], ignore_index=True))
+    
+    def save(self, path: str = INDEX_PATH):
+        """Write the index as one .npz (no pickles) and move it into place atomically"""
+        arrays = {'partition_codes': self.partition_codes}
+        for column in LISTING_COLUMNS + METRICS:
+            dtype = str if column in TEXT_COLUMNS else float
+            arrays[f'listing__{column}'] = self.listings[column].fillna('' if dtype is str else np.nan) \
+                .to_numpy(dtype=dtype)
+        for column in PARTITION_COLUMNS:
+            arrays[f'partition__{column}'] = self.partitions[column].to_numpy(dtype=str)
+        for metric in METRICS:
+            for name in ['rows', 'values', 'offsets', 'global_rows', 'global_values']:
+                arrays[f'{name}__{metric}'] = getattr(self, name)[metric]
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        logger.info(f"Screening index saved: {path} ({len(self.listings)} listings, "
+                    f"{len(self.partitions)} partitions)")
+    
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> 'ScreeningIndex':
+        """Read an index written by save()"""
+        with np.load(path) as data:
+            listings = pd.DataFrame({c: data[f'listing__{c}'] for c in LISTING_COLUMNS + METRICS})
+            for column in TEXT_COLUMNS:
+                listings[column] = listings[column].astype(object)
+            partitions = pd.DataFrame({c: data[f'partition__{c}'].astype(object) for c in PARTITION_COLUMNS})
+            arrays = {name: {metric: data[f'{name}__{metric}'] for metric in METRICS}
+                      for name in ['rows', 'values', 'offsets', 'global_rows', 'global_values']}
+            return cls(listings, data['partition_codes'], partitions, **arrays)
+    
+    def select_partitions(self, towns: Optional[Iterable[str]] = None, zip_codes: Optional[Iterable[str]] = None,
+                          unit_buckets: Optional[Iterable[str]] = None) -> Optional[np.ndarray]:
+        """Partition ids matching the filters (None when unfiltered)"""
+        if towns is None and zip_codes is None and unit_buckets is None:
+            return None
+            
+        mask = np.ones(len(self.partitions), dtype=bool)
+        if towns is not None:
+            canonical = get_normalizer().normalize(pd.Series(list(towns), dtype=object))[0]
+            mask &= self.partitions['TOWN'].isin(set(canonical.dropna())).to_numpy()
+        if zip_codes is not None:
+            mask &= self.partitions['ZIP_CODE'].isin({str(z).zfill(5) for z in zip_codes}).to_numpy()
+        if unit_buckets is not None:
+            mask &= self.partitions['unit_bucket'].isin(set(unit_buckets)).to_numpy()
+        return np.flatnonzero(mask)
+    
+    def segments(self, metric: str, partitions: Optional[np.ndarray], low: Optional[float] = None,
+                 high: Optional[float] = None) -> List[slice]:
+        """Slices of the sorted metric arrays holding values in [low, high] for the partitions"""
+        values = self.global_values[metric] if partitions is None else self.values[metric]
+        if partitions is None:
+            bounds = [(0, len(values))]
+        else:
+            offsets = self.offsets[metric]
+            bounds = zip(offsets[partitions], offsets[partitions + 1])
+        
+        segments = []
+        for start, end in bounds:
+            if low is not None:
+                start += int(np.searchsorted(values[start:end], low, side='left'))
+            if high is not None:
+                end = start + int(np.searchsorted(values[start:end], high, side='right'))
+            if end > start:
+                segments.append(slice(start, end))
+        return segments
+    
+    def arrays(self, metric: str, partitions: Optional[np.ndarray]):
+        """Row positions and sorted values to search: per-partition runs, or the global run when unfiltered"""
+        if partitions is None:
+            return self.global_rows[metric], self.global_values[metric]
+        return self.rows[metric], self.values[metric]
+    
+    def result(self, metric: str, rows: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        """Listing columns for the given rows, in order, with the metric value alongside"""
+        result = self.listings.iloc[rows][LISTING_COLUMNS].reset_index(drop=True)
+        result[metric] = values
+        return result
+    
+    def top_k(self, metric: str, k: int = 50, descending: bool = True, low: Optional[float] = None,
+              high: Optional[float] = None, **filters) -> pd.DataFrame:
+        """Best k listings by a metric, optionally within a value range and towns/ZIPs/unit buckets"""
+        partitions = self.select_partitions(**filters)
+        rows, values = self.arrays(metric, partitions)
+        
+        # At most k candidates from each partition's sorted run, then one small sort
+        candidates = np.concatenate([
+            np.arange(max(s.start, s.stop - k), s.stop) if descending else np.arange(s.start, min(s.stop, s.start + k))
+            for s in self.segments(metric, partitions, low, high)
+        ] or [np.empty(0, dtype=np.int64)])
+        candidate_values = values[candidates]
+        order = np.argsort(-candidate_values if descending else candidate_values, kind='stable')[:k]
+        return self.result(metric, rows[candidates[order]], candidate_values[order])
+    
+    def in_range(self, metric: str, low: Optional[float] = None, high: Optional[float] = None,
+              **filters) -> pd.DataFrame:
+        """Every listing with the metric in [low, high], ascending"""
+        partitions = self.select_partitions(**filters)
+        rows, values = self.arrays(metric, partitions)
+        positions = np.concatenate([np.arange(s.start, s.stop) for s in self.segments(metric, partitions, low, high)]
+                                   or [np.empty(0, dtype=np.int64)])
+        order = np.argsort(values[positions], kind='stable')
+        return self.result(metric, rows[positions[order]], values[positions[order]])
+    
+    def percentile(self, metric: str, q: float, **filters) -> float:
+        """q-th percentile of the metric over the filtered listings"""
+        partitions = self.select_partitions(**filters)
+        _, values = self.arrays(metric, partitions)
+        segments = self.segments(metric, partitions)
+        if len(segments) == 1:
+            return sorted_percentile(values[segments[0]], q)
+        if not segments:
+            return float('nan')
+        return float(np.percentile(np.concatenate([values[s] for s in segments]), q))
+    
+    def percentile_rank(self, metric: str, value: float, **filters) -> float:
+        """Share (0-100) of the filtered listings at or below a value"""
+        partitions = self.select_partitions(**filters)
+        _, values = self.arrays(metric, partitions)
+        segments = self.segments(metric, partitions)
+        total = sum(s.stop - s.start for s in segments)
+        if total == 0:
+            return float('nan')
+        below = sum(int(np.searchsorted(values[s], value, side='right')) for s in segments)
+        return 100.0 * below / total
+
+
+def load_stored_listings(engine) -> List[Dict]:
+    """On-market listing records (raw_data) from the listings table"""
+    from sqlalchemy import text
+    
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT raw_data FROM {LISTINGS_TABLE} "
+            f"WHERE status IS DISTINCT FROM :off_market AND raw_data IS NOT NULL ORDER BY list_no"
+        ), {'off_market': OFF_MARKET_STATUS}).fetchall()
+    return [row[0] for row in rows]
+
+
+def rebuild_screening_index(engine=None, listings_path: Optional[str] = None,
+                            output_path: str = INDEX_PATH) -> Optional[ScreeningIndex]:
+    """Rebuild and save the index from current listings and canonical rents.
+    
+    Listings come from the listings table (the inventory listing_ingestion.py keeps), or
+    from a listings.json snapshot when listings_path is given or the table is still empty.
+    """
+    try:
+        from rent_reconciliation import RentReconciliation
+        
+        started = time.perf_counter()
+        engine = RentReconciliation(engine).get_engine()
+        simulation = RentSimulation(engine=engine)
+        listings = None
+        if listings_path is None:
+            listings = load_stored_listings(engine)
+            if not listings:
+                logger.warning("No listings stored yet; building the screening index from listings.json")
+        if not listings:
+            listings = simulation.load_listings(listings_path or os.path.join(DATA_DIR, 'listings.json'))
+        index = ScreeningIndex.build(listing_metrics(simulation.prepare(listings)))
+        index.save(output_path)
+        logger.info(f"Screening index rebuilt in {time.perf_counter() - started:.2f}s")
+        return index
+        
+    except Exception as e:
+        logger.error(f"Error rebuilding screening index: {e}")
+        return None
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('/var/log/screening-index.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    parser = argparse.ArgumentParser(description='Listing screening index')
+    parser.add_argument('--index', default=INDEX_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build_parser = subparsers.add_parser('build', help='Rebuild the index from listings and canonical rents')
+    build_parser.add_argument('--listings', default=None,
+                              help='Build from a listings.json snapshot instead of the listings table')
+    
+    top_parser = subparsers.add_parser('top', help='Top listings by a metric')
+    top_parser.add_argument('--metric', choices=METRICS, default='cap_rate')
+    top_parser.add_argument('-k', type=int, default=50)
+    top_parser.add_argument('--ascending', action='store_true')
+    top_parser.add_argument('--town', action='append', default=None)
+    top_parser.add_argument('--zip', action='append', default=None)
+    top_parser.add_argument('--units', action='append', choices=UNIT_BUCKETS, default=None)
+    top_parser.add_argument('--min', type=float, default=None)
+    top_parser.add_argument('--max', type=float, default=None)
+    args = parser.parse_args()
+    
+    try:
+        if args.command == 'build':
+            index = rebuild_screening_index(listings_path=args.listings, output_path=args.index)
+            if index is None:
+                print("❌ Screening index build failed")
+                exit(1)
+            print(f"✅ Screening index built ({len(index.listings)} listings)")
+        else:
+            index = ScreeningIndex.load(args.index)
+            result = index.top_k(args.metric, args.k, descending=not args.ascending, low=args.min, high=args.max,
+                                 towns=args.town, zip_codes=args.zip, unit_buckets=args.units)
+            print(result.to_string(index=False))
+        exit(0)
+    
+    except Exception as e:
+        logger.error(f"Main function error: {e}")
+        print(f"❌ Error: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,25 @@ set -e
 echo "Setting up BHA data pipeline cron job..."
 
 # Create the cron job entry
-# Runs on the 1st of each month at 2 AM
-CRON_JOB="0 2 1 * * cd /opt/rent-api && source venv/bin/activate && python3 bha-payment-standards-future.py >> /var/log/bha-data-pipeline.log 2>&1"
+# Queues a run on the 1st of each month at 2 AM; the pipeline_jobs workers run it, so a
+# run already queued or in progress is never duplicated
+CRON_JOB="0 2 1 * * cd /opt/rent-api && source venv/bin/activate && python3 pipeline_jobs.py enqueue bha-payment-standards >> /var/log/bha-data-pipeline.log 2>&1"
+
+# Compress, deduplicate and prune pipeline artifacts an hour after the pipeline runs
+RETENTION_JOB="0 3 1 * * cd /opt/rent-api && source venv/bin/activate && python3 data_retention.py >> /var/log/data-retention.log 2>&1"
+
+# Pick up override and comp saves from the API in the listing/rent cell index every 15 minutes,
+# and rebuild it nightly so deleted overrides and comps drop out
+DEPENDENCY_SYNC_JOB="*/15 * * * * cd /opt/rent-api && source venv/bin/activate && python3 listing_dependencies.py sync >> /var/log/listing-dependencies.log 2>&1"
+DEPENDENCY_REBUILD_JOB="30 3 * * * cd /opt/rent-api && source venv/bin/activate && python3 listing_dependencies.py rebuild >> /var/log/listing-dependencies.log 2>&1"
 
 # Add to crontab
-(crontab -l 2>/dev/null; echo "$CRON_JOB") | crontab -
+(crontab -l 2>/dev/null; echo "$CRON_JOB"; echo "$RETENTION_JOB"; echo "$DEPENDENCY_SYNC_JOB"; echo "$DEPENDENCY_REBUILD_JOB") | crontab -
 
 echo "✅ BHA data pipeline cron job set up successfully!"
-echo "📅 Schedule: 1st of each month at 2:00 AM"
-echo "📝 Logs: /var/log/bha-data-pipeline.log"
+echo "📅 Schedule: 1st of each month at 2:00 AM (data retention at 3:00 AM)"
+echo "📅 Listing dependencies: sync every 15 minutes, full rebuild daily at 3:30 AM"
+echo "📝 Logs: /var/log/bha-data-pipeline.log (queueing), /var/log/pipeline-jobs.log (runs)"
 
 # Test the cron job setup
 echo "Current crontab entries:"
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Town Normalization Script
+Resolves free-form town strings to canonical Massachusetts municipalities and neighborhoods
+"""
+
+import json
+import logging
+import os
+import re
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv('RENT_JSON_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+LISTINGS_FILENAME = 'listings.json'
+
+# The 351 cities and towns of the Commonwealth, as spelled by the Secretary of State
+MA_MUNICIPALITIES = (
+    'Abington', 'Acton', 'Acushnet', 'Adams', 'Agawam', 'Alford', 'Amesbury', 'Amherst', 'Andover',
+    'Aquinnah', 'Arlington', 'Ashburnham', 'Ashby', 'Ashfield', 'Ashland', 'Athol', 'Attleboro',
+    'Auburn', 'Avon', 'Ayer', 'Barnstable', 'Barre', 'Becket', 'Bedford', 'Belchertown', 'Bellingham',
+    'Belmont', 'Berkley', 'Berlin', 'Bernardston', 'Beverly', 'Billerica', 'Blackstone', 'Blandford',
+    'Bolton', 'Boston', 'Bourne', 'Boxborough', 'Boxford', 'Boylston', 'Braintree', 'Brewster',
+    'Bridgewater', 'Brimfield', 'Brockton', 'Brookfield', 'Brookline', 'Buckland', 'Burlington',
+    'Cambridge', 'Canton', 'Carlisle', 'Carver', 'Charlemont', 'Charlton', 'Chatham', 'Chelmsford',
+    'Chelsea', 'Cheshire', 'Chester', 'Chesterfield', 'Chicopee', 'Chilmark', 'Clarksburg', 'Clinton',
+    'Cohasset', 'Colrain', 'Concord', 'Conway', 'Cummington', 'Dalton', 'Danvers', 'Dartmouth',
+    'Dedham', 'Deerfield', 'Dennis', 'Dighton', 'Douglas', 'Dover', 'Dracut', 'Dudley', 'Dunstable',
+    'Duxbury', 'East Bridgewater', 'East Brookfield', 'East Longmeadow', 'Eastham', 'Easthampton',
+    'Easton', 'Edgartown', 'Egremont', 'Erving', 'Essex', 'Everett', 'Fairhaven', 'Fall River',
+    'Falmouth', 'Fitchburg', 'Florida', 'Foxborough', 'Framingham', 'Franklin', 'Freetown', 'Gardner',
+    'Georgetown', 'Gill', 'Gloucester', 'Goshen', 'Gosnold', 'Grafton', 'Granby', 'Granville',
+    'Great Barrington', 'Greenfield', 'Groton', 'Groveland', 'Hadley', 'Halifax', 'Hamilton', 'Hampden',
+    'Hancock', 'Hanover', 'Hanson', 'Hardwick', 'Harvard', 'Harwich', 'Hatfield', 'Haverhill', 'Hawley',
+    'Heath', 'Hingham', 'Hinsdale', 'Holbrook', 'Holden', 'Holland', 'Holliston', 'Holyoke', 'Hopedale',
+    'Hopkinton', 'Hubbardston', 'Hudson', 'Hull', 'Huntington', 'Ipswich', 'Kingston', 'Lakeville',
+    'Lancaster', 'Lanesborough', 'Lawrence', 'Lee', 'Leicester', 'Lenox', 'Leominster', 'Leverett',
+    'Lexington', 'Leyden', 'Lincoln', 'Littleton', 'Longmeadow', 'Lowell', 'Ludlow', 'Lunenburg',
+    'Lynn', 'Lynnfield', 'Malden', 'Manchester-by-the-Sea', 'Mansfield', 'Marblehead', 'Marion',
+    'Marlborough', 'Marshfield', 'Mashpee', 'Mattapoisett', 'Maynard', 'Medfield', 'Medford', 'Medway',
+    'Melrose', 'Mendon', 'Merrimac', 'Methuen', 'Middleborough', 'Middlefield', 'Middleton', 'Milford',
+    'Millbury', 'Millis', 'Millville', 'Milton', 'Monroe', 'Monson', 'Montague', 'Monterey',
+    'Montgomery', 'Mount Washington', 'Nahant', 'Nantucket', 'Natick', 'Needham', 'New Ashford',
+    'New Bedford', 'New Braintree', 'New Marlborough', 'New Salem', 'Newbury', 'Newburyport', 'Newton',
+    'Norfolk', 'North Adams', 'North Andover', 'North Attleborough', 'North Brookfield',
+    'North Reading', 'Northampton', 'Northborough', 'Northbridge', 'Northfield', 'Norton', 'Norwell',
+    'Norwood', 'Oak Bluffs', 'Oakham', 'Orange', 'Orleans', 'Otis', 'Oxford', 'Palmer', 'Paxton',
+    'Peabody', 'Pelham', 'Pembroke', 'Pepperell', 'Peru', 'Petersham', 'Phillipston', 'Pittsfield',
+    'Plainfield', 'Plainville', 'Plymouth', 'Plympton', 'Princeton', 'Provincetown', 'Quincy',
+    'Randolph', 'Raynham', 'Reading', 'Rehoboth', 'Revere', 'Richmond', 'Rochester', 'Rockland',
+    'Rockport', 'Rowe', 'Rowley', 'Royalston', 'Russell', 'Rutland', 'Salem', 'Salisbury',
+    'Sandisfield', 'Sandwich', 'Saugus', 'Savoy', 'Scituate', 'Seekonk', 'Sharon', 'Sheffield',
+    'Shelburne', 'Sherborn', 'Shirley', 'Shrewsbury', 'Shutesbury', 'Somerset', 'Somerville',
+    'South Hadley', 'Southampton', 'Southborough', 'Southbridge', 'Southwick', 'Spencer', 'Springfield',
+    'Sterling', 'Stockbridge', 'Stoneham', 'Stoughton', 'Stow', 'Sturbridge', 'Sudbury', 'Sunderland',
+    'Sutton', 'Swampscott', 'Swansea', 'Taunton', 'Templeton', 'Tewksbury', 'Tisbury', 'Tolland',
+    'Topsfield', 'Townsend', 'Truro', 'Tyngsborough', 'Tyringham', 'Upton', 'Uxbridge', 'Wakefield',
+    'Wales', 'Walpole', 'Waltham', 'Ware', 'Wareham', 'Warren', 'Warwick', 'Washington', 'Watertown',
+    'Wayland', 'Webster', 'Wellesley', 'Wellfleet', 'Wendell', 'Wenham', 'West Boylston',
+    'West Bridgewater', 'West Brookfield', 'West Newbury', 'West Springfield', 'West Stockbridge',
+    'West Tisbury', 'Westborough', 'Westfield', 'Westford', 'Westhampton', 'Westminster', 'Weston',
+    'Westport', 'Westwood', 'Weymouth', 'Whately', 'Whitman', 'Wilbraham', 'Williamsburg',
+    'Williamstown', 'Wilmington', 'Winchendon', 'Winchester', 'Windsor', 'Winthrop', 'Woburn',
+    'Worcester', 'Worthington', 'Wrentham', 'Yarmouth'
+)
+
+# Informal spellings and abbreviations -> official name
+TOWN_ALIASES = {
+    'Attleborough': 'Attleboro',
+    'Boxboro': 'Boxborough',
+    'Foxboro': 'Foxborough',
+    'Lanesboro': 'Lanesborough',
+    'Manchester': 'Manchester-by-the-Sea',
+    'Marlboro': 'Marlborough',
+    'Middleboro': 'Middleborough',
+    'Mt Washington': 'Mount Washington',
+    'New Marlboro': 'New Marlborough',
+    'North Attleboro': 'North Attleborough',
+    'Northboro': 'Northborough',
+    'Southboro': 'Southborough',
+    'Tyngsboro': 'Tyngsborough',
+    'Westboro': 'Westborough',
+    'Gay Head': 'Aquinnah',
+    'Vineyard Haven': 'Tisbury',
+}
+
+# Neighborhoods that pipelines report as "<town> - <neighborhood>"
+NEIGHBORHOODS = {
+    'Boston': [
+        'Allston', 'Back Bay', 'Bay Village', 'Beacon Hill', 'Brighton', 'Charlestown', 'Chinatown',
+        'Dorchester', 'Downtown', 'East Boston', 'Fenway', 'Financial District', 'Harvard Business School',
+        'Hyde Park', 'Jamaica Plain', 'Kenmore', 'Leather District', 'Longwood', 'Mattapan', 'Mission Hill',
+        'North End', 'Roslindale', 'Roxbury', 'Seaport', 'South Boston', 'South End', 'West End', 'West Roxbury'
+    ],
+    'Newton': [
+        'Auburndale', 'Chestnut Hill', 'Newton Centre', 'Newton Corner', 'Newton Highlands', 'Newton Lower Falls',
+        'Newton Upper Falls', 'Newtonville', 'Nonantum', 'Oak Hill', 'Thompsonville', 'Waban', 'West Newton'
+    ],
+}
+
+NEIGHBORHOOD_ALIASES = {
+    'Boston': {
+        'Harvard Business': 'Harvard Business School',
+        'Financial Dist': 'Financial District',
+        'JP': 'Jamaica Plain',
+        'Southie': 'South Boston',
+        'Eastie': 'East Boston',
+        'Seaport District': 'Seaport',
+    },
+    'Newton': {
+        'Newton Center': 'Newton Centre',
+    },
+}
+
+# Villages and postal place names that are not municipalities -> (municipality, village)
+VILLAGES = {
+    'Bondsville': 'Palmer', 'Thorndike': 'Palmer', 'Three Rivers': 'Palmer',
+    'Centerville': 'Barnstable', 'Cotuit': 'Barnstable', 'Hyannis': 'Barnstable', 'Osterville': 'Barnstable',
+    'Feeding Hills': 'Agawam',
+    'Florence': 'Northampton', 'Leeds': 'Northampton',
+    'Gilbertville': 'Hardwick',
+    'Haydenville': 'Williamsburg',
+    'Indian Orchard': 'Springfield',
+    'North Amherst': 'Amherst',
+    'North Hatfield': 'Hatfield', 'West Hatfield': 'Hatfield',
+    'East Otis': 'Otis',
+    'East Walpole': 'Walpole',
+    'East Wareham': 'Wareham',
+    'East Weymouth': 'Weymouth',
+    'Turners Falls': 'Montague',
+    'Wellesley Hills': 'Wellesley',
+    'West Warren': 'Warren',
+    'Whitinsville': 'Northbridge',
+}
+
+# ", MA" / " Massachusetts" suffixes and "City of" / "Town of" prefixes
+STATE_SUFFIX = r'(?:,\s*|\s+)(?:MA|Mass\.?|Massachusetts)\.?(?:\s+\d{5}(?:-\d{4})?)?\s*$'
+MUNICIPAL_PREFIX = r'^\s*(?:City|Town)\s+of\s+'
+
+# "Boston - Back Bay", "Boston: Back Bay", "Boston – Back Bay"
+NEIGHBORHOOD_SEPARATOR = r'\s+[-\u2013:]\s+|\s*:\s*'
+MULTI_NEIGHBORHOOD_SEPARATOR = re.compile(r'\s*/\s*')
+
+# Values that carry no town at all (rents.json uses ZIP_<zip> placeholders)
+PLACEHOLDER = re.compile(r'^(?:ZIP_\d{5}|unknown|n/?a|none|nan|)$', re.IGNORECASE)
+
+FUZZY_CUTOFF = 0.88
+CACHE_SIZE = 4096
+
+
+def match_key(value: str) -> str:
+    """Case, punctuation and whitespace-insensitive lookup key"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value.lower()).split())
+
+
+class TownNormalizer:
+    """Town Normalizer Class
+    
+    Every known spelling is compiled once into a key index; strings that miss it fall
+    back to a fuzzy match. Each distinct string is resolved once (LRU-memoized), and
+    columns are processed per distinct value, so a frame costs as much as its unique towns.
+    """
+    
+    def __init__(self, zip_towns: Optional[Dict[str, str]] = None, fuzzy_cutoff: float = FUZZY_CUTOFF,
+                 cache_size: int = CACHE_SIZE):
+        self.zip_towns = dict(zip_towns or {})
+        self.fuzzy_cutoff = fuzzy_cutoff
+        
+        # key -> (municipality, neighborhood or village)
+        self.index: Dict[str, Tuple[str, Optional[str]]] = {}
+        for town in MA_MUNICIPALITIES:
+            self.index[match_key(town)] = (town, None)
+        for alias, town in TOWN_ALIASES.items():
+            self.index[match_key(alias)] = (town, None)
+        for village, town in VILLAGES.items():
+            self.index.setdefault(match_key(village), (town, village))
+        for town, neighborhoods in NEIGHBORHOODS.items():
+            for neighborhood in neighborhoods:
+                self.index.setdefault(match_key(neighborhood), (town, neighborhood))
+        self.keys = list(self.index)
+        
+        # town -> key -> neighborhood, for the part after the separator
+        self.neighborhood_index: Dict[str, Dict[str, str]] = {}
+        for town, neighborhoods in NEIGHBORHOODS.items():
+            lookup = {match_key(n): n for n in neighborhoods}
+            lookup.update({match_key(a): n for a, n in NEIGHBORHOOD_ALIASES.get(town, {}).items()})
+            self.neighborhood_index[town] = lookup
+        
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+    
+    def fuzzy(self, key: str, candidates: List[str]) -> Optional[str]:
+        matches = get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        return matches[0] if matches else None
+    
+    def resolve_neighborhood(self, town: str, raw: str) -> str:
+        """Canonical spelling of one neighborhood within a town (unknown ones are kept as given)"""
+        lookup = self.neighborhood_index.get(town, {})
+        key = match_key(raw)
+        if key not in lookup:
+            key = self.fuzzy(key, list(lookup)) or key
+        return lookup.get(key, raw.strip())
+    
+    def _resolve(self, town_part: Optional[str], neighborhood_part: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(municipality, neighborhood) for one pre-cleaned string; (None, None) for placeholders"""
+        if town_part is None or PLACEHOLDER.match(town_part.strip()):
+            return None, None
+            
+        key = match_key(town_part)
+        if key not in self.index:
+            key = self.fuzzy(key, self.keys) or key
+        if key not in self.index:
+            logger.debug(f"Unrecognized town kept as given: {town_part!r}")
+            return town_part.strip(), neighborhood_part.strip() if neighborhood_part else None
+            
+        town, neighborhood = self.index[key]
+        if neighborhood_part:
+            neighborhood = ' / '.join(
+                self.resolve_neighborhood(town, part)
+                for part in MULTI_NEIGHBORHOOD_SEPARATOR.split(neighborhood_part.strip()) if part
+            )
+        return town, neighborhood
+    
+    def normalize(self, towns: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized normalization of a town column into (municipality, neighborhood) columns"""
+        codes, uniques = pd.factorize(towns)
+        if len(uniques) == 0:
+            empty = pd.Series(None, index=towns.index, dtype=object)
+            return empty, empty.copy()
+            
+        cleaned = (
+            pd.Series(uniques, dtype=object).astype(str)
+            .str.replace(STATE_SUFFIX, '', regex=True, flags=re.IGNORECASE)
+            .str.replace(MUNICIPAL_PREFIX, '', regex=True, flags=re.IGNORECASE)
+            .str.strip()
+        )
+        parts = cleaned.str.split(NEIGHBORHOOD_SEPARATOR, n=1, regex=True, expand=True)
+        town_parts = parts[0]
+        neighborhood_parts = parts[1] if 1 in parts.columns else pd.Series(None, index=parts.index)
+        
+        resolved = [self.resolve(t, n if isinstance(n, str) else None)
+                    for t, n in zip(town_parts, neighborhood_parts)]
+        
+        # Code -1 (missing input) picks the trailing None
+        municipalities = np.array([r[0] for r in resolved] + [None], dtype=object)
+        neighborhoods = np.array([r[1] for r in resolved] + [None], dtype=object)
+        return (pd.Series(municipalities[codes], index=towns.index, dtype=object),
+                pd.Series(neighborhoods[codes], index=towns.index, dtype=object))
+    
+    def normalize_frame(self, df: pd.DataFrame, town_column: str = 'town', zip_column: str = 'zip_code',
+                        neighborhood_column: str = 'neighborhood') -> pd.DataFrame:
+        """Replace a frame's town column with municipalities and add a neighborhood column.
+        
+        Rows without a usable town (placeholders, blanks) take the town the frame's other
+        rows, or the known ZIP->town map, give their ZIP code.
+        """
+        if town_column not in df.columns:
+            return df
+            
+        df = df.copy()
+        towns, neighborhoods = self.normalize(df[town_column])
+        
+        missing = towns.isna()
+        if missing.any() and zip_column in df.columns:
+            zip_codes = df[zip_column].astype(str).str.zfill(5)
+            from_frame = towns[~missing].groupby(zip_codes[~missing]).agg(lambda s: s.mode().iat[0])
+            zip_towns = {**self.zip_towns, **from_frame.to_dict()}
+            towns = towns.fillna(zip_codes.map(zip_towns))
+            logger.info(f"Resolved {int(missing.sum() - towns.isna().sum())} of {int(missing.sum())} "
+                        f"missing towns from ZIP codes")
+        
+        df[town_column] = towns
+        if neighborhood_column in df.columns:
+            neighborhoods = neighborhoods.fillna(df[neighborhood_column])
+        df[neighborhood_column] = neighborhoods
+        return df
+    
+    def cache_info(self):
+        return self.resolve.cache_info()
+
+
+def load_listing_zip_towns(filepath: Optional[str] = None) -> Dict[str, str]:
+    """Most common municipality per ZIP code in the MLS listings snapshot"""
+    filepath = filepath or os.path.join(DATA_DIR, LISTINGS_FILENAME)
+    try:
+        with open(filepath, 'r') as f:
+            listings = pd.DataFrame(json.load(f).get('listings', []))
+        if listings.empty or 'TOWN' not in listings.columns:
+            return {}
+            
+        towns, _ = TownNormalizer().normalize(listings['TOWN'])
+        zip_codes = listings['ZIP_CODE'].astype(str).str.zfill(5)
+        known = towns.notna()
+        return towns[known].groupby(zip_codes[known]).agg(lambda s: s.mode().iat[0]).to_dict()
+        
+    except Exception as e:
+        logger.warning(f"Could not load ZIP->town map from {filepath}: {e}")
+        return {}
+
+
+_default_normalizer: Optional[TownNormalizer] = None
+
+
+def get_normalizer() -> TownNormalizer:
+    """Shared normalizer (and memo) for the process, seeded with the listings ZIP->town map"""
+    global _default_normalizer
+    if _default_normalizer is None:
+        _default_normalizer = TownNormalizer(zip_towns=load_listing_zip_towns())
+    return _default_normalizer
+
+
+def normalize_towns(df: pd.DataFrame, town_column: str = 'town', zip_column: str = 'zip_code') -> pd.DataFrame:
+    """Normalize a frame's town column with the shared normalizer"""
+    return get_normalizer().normalize_frame(df, town_column, zip_column)